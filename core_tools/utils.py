@@ -26,6 +26,22 @@ def extract_props(obj, key_type, trainer):
        
    return new_obj
 
+def extract_dtypes(obj, trainer):
+   # categorical strings are read as pandas categoricals, and integers in their narrowest width.
+   # categorical integers stay integers, min and max of an unordered categorical are undefined.
+   new_obj = {}
+
+   for k in obj:
+        trainer_obj = obj[k][trainer]
+        if trainer_obj.get('ignore_column'):
+            continue
+        if trainer_obj.get('type') == 'String' and trainer_obj.get('is_categorical'):
+            new_obj[k] = 'category'
+        elif trainer_obj.get('type') == 'Integer':
+            new_obj[k] = 'integer'
+
+   return new_obj
+
 def convert_to_datetime(date_str):
    try:
       return parser.parse(date_str).strftime("%Y-%m-%d %H:%M:%S")
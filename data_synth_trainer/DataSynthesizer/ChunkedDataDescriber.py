@@ -0,0 +1,216 @@
+from typing import Dict, Union
+
+import numpy as np
+from pandas import read_csv
+
+from DataDescriber import DataDescriber
+from datatypes.utils.AttributeSummary import AttributeSummary
+from datatypes.utils.DataType import DataType
+from lib import utils
+from lib.sketches import HyperLogLog, QuantileSketch
+
+
+class ChunkedDataDescriber(DataDescriber):
+    """Describe a dataset larger than memory by reading it in chunks of fixed size.
+
+    The file is read twice. The first pass collects the number of values, missing values, min, max and distinct values
+    of every attribute, which decide candidate keys, categorical attributes and domains. The second pass fills the
+    histograms and, in correlated attribute mode, encodes every chunk into binning indices. The summaries and the
+    encoded dataset are held in memory, besides one chunk at a time.
+
+    Data types are inferred from the first chunk, as DataDescriber infers them from a sample of values.
+
+    The uniqueness of candidate keys is decided by 64-bit hashes of all values, which take memory in proportion to the
+    number of rows. In approximate mode, it is estimated by a HyperLogLog sketch instead, in a fixed amount of memory
+    per attribute, and histograms of integers and floats have bins of equal frequency, whose edges are quantiles
+    estimated by a KLL sketch. The error bounds of the sketches in use are recorded in the meta of the description.
+
+    Attributes
+    ----------
+    chunk_size : int
+        Number of rows read at a time.
+    dataset_file : str
+        File name of the input dataset.
+    encoding : str
+        Encoding of the input dataset, None for the default.
+    attr_to_summary : dict
+        Dictionary of {attribute: AttributeSummary}.
+    encode_in_second_pass : bool
+        Whether the second pass encodes the dataset into binning indices.
+    approximate : bool
+        Whether to describe the dataset with sketches in memory independent of its number of distinct values.
+    exact_keys : bool
+        Whether to find candidate keys by hashes of all values instead of a HyperLogLog sketch. Defaults to not
+        approximate.
+    """
+
+    def __init__(self, histogram_bins: Union[int, str] = 20, category_threshold=20, null_values=None,
+                 chunk_size=100000, approximate=False, attribute_to_dtype: Dict[str, str] = None, exact_keys=None):
+        if not isinstance(histogram_bins, int):
+            raise Exception(f'Histograms of chunked datasets require a fixed number of bins, not {histogram_bins}.')
+        super().__init__(histogram_bins, category_threshold, null_values, attribute_to_dtype=attribute_to_dtype)
+        self.chunk_size = chunk_size
+        self.dataset_file: str = None
+        self.encoding: str = None
+        self.attr_to_summary: Dict[str, AttributeSummary] = None
+        self.encode_in_second_pass = False
+        self.approximate = approximate
+        self.exact_keys = not approximate if exact_keys is None else exact_keys
+
+    def describe_dataset_in_correlated_attribute_mode(self, *args, **kwargs):
+        self.encode_in_second_pass = True
+        super().describe_dataset_in_correlated_attribute_mode(*args, **kwargs)
+
+    def refresh_dataset_description(self, *args, **kwargs):
+        raise Exception('New rows are read in memory to refresh a description, by DataDescriber.')
+
+    def read_chunks(self, file_name=None):
+        """Read file_name, by default the input dataset, in chunks of chunk_size rows."""
+        chunks = read_csv(file_name or self.dataset_file, skipinitialspace=True, na_values=self.null_values,
+                          dtype=self.csv_dtypes(), encoding=self.encoding, chunksize=self.chunk_size)
+        try:
+            for chunk in chunks:
+                self.downcast_integer_attributes(chunk)
+                yield chunk
+        finally:
+            chunks.close()
+
+    def read_dataset_from_csv(self, file_name=None):
+        """Read the first chunk only, as df_input."""
+        self.dataset_file = file_name
+        self.encoding = None
+        try:
+            self.df_input = self.read_first_chunk()
+        except UnicodeDecodeError:
+            self.encoding = 'latin1'
+            self.df_input = self.read_first_chunk()
+
+    def read_first_chunk(self):
+        chunks = self.read_chunks()
+        try:
+            return next(chunks)
+        finally:
+            # closes the file, which the rest of the chunks would otherwise keep open.
+            chunks.close()
+
+    def summarize_chunks(self, chunks) -> Dict[str, AttributeSummary]:
+        """First pass over chunks of the dataset."""
+        attr_to_summary = {}
+        for attr in self.df_input:
+            track_uniqueness = attr not in self.attr_to_is_candidate_key
+            track_quantiles = (self.approximate and not self.attr_to_is_categorical.get(attr, False)
+                               and self.attr_to_datatype[attr] in {DataType.INTEGER, DataType.FLOAT})
+            if attr in self.attr_to_is_categorical:
+                summary = AttributeSummary(track_values=self.attr_to_is_categorical[attr],
+                                           track_uniqueness=track_uniqueness, track_quantiles=track_quantiles,
+                                           exact_uniqueness=self.exact_keys)
+            else:
+                summary = AttributeSummary(max_distinct=self.category_threshold, track_uniqueness=track_uniqueness,
+                                           track_quantiles=track_quantiles, exact_uniqueness=self.exact_keys)
+            attr_to_summary[attr] = summary
+
+        for chunk in chunks:
+            for attr, summary in attr_to_summary.items():
+                summary.update_domain(self.create_attribute(attr, chunk[attr]))
+        return attr_to_summary
+
+    def summarize_dataset(self):
+        self.attr_to_summary = self.summarize_chunks(self.read_chunks())
+
+    def count_chunks(self, chunks):
+        """Second pass over chunks of the dataset.
+
+        Returns
+        -------
+        attr_to_histogram : dict
+            Dictionary of {attribute: histogram} of non-categorical attributes.
+        df_encoded : DataFrame
+            Chunks encoded into binning indices if encode_in_second_pass, otherwise None.
+        """
+        attr_to_histogram = {attr: np.zeros_like(column.summary.histogram)
+                             for attr, column in self.attr_to_column.items() if not column.is_categorical}
+        attributes_in_BN = self.data_description['meta']['attributes_in_BN'] if self.encode_in_second_pass else []
+        attr_to_encoded_chunks = {attr: [] for attr in attributes_in_BN}
+        for chunk in chunks:
+            for attr, column in self.attr_to_column.items():
+                chunk_column = self.create_attribute(attr, chunk[attr])
+                if attr in attr_to_histogram:
+                    attr_to_histogram[attr] += np.histogram(chunk_column.binning_values(),
+                                                            bins=column.summary.histogram_edges)[0]
+                if attr in attr_to_encoded_chunks:
+                    chunk_column.is_categorical = column.is_categorical
+                    chunk_column.min = column.min
+                    chunk_column.max = column.max
+                    chunk_column.distribution_bins = column.distribution_bins
+                    attr_to_encoded_chunks[attr].append(chunk_column.encode_values_into_bin_idx().to_numpy())
+
+        if attributes_in_BN:
+            columns = [np.concatenate(attr_to_encoded_chunks[attr]) for attr in attributes_in_BN]
+            return attr_to_histogram, utils.stack_encoded_columns(columns, attributes_in_BN)
+        return attr_to_histogram, None
+
+    def analyze_dataset_meta(self):
+        try:
+            self.summarize_dataset()
+        except UnicodeDecodeError:
+            self.encoding = 'latin1'
+            self.summarize_dataset()
+
+        for attr, summary in self.attr_to_summary.items():
+            if attr not in self.attr_to_is_candidate_key:
+                self.attr_to_is_candidate_key[attr] = summary.is_unique()
+            summary.hashes = None
+
+        super().analyze_dataset_meta()
+        self.data_description['meta']['num_tuples'] = next(iter(self.attr_to_summary.values())).num_tuples
+        approximation = {}
+        if any(summary.distinct_sketch is not None for summary in self.attr_to_summary.values()):
+            approximation['distinct_count_relative_error'] = HyperLogLog().relative_error
+        if self.approximate:
+            approximation['histogram_quantile_rank_error'] = QuantileSketch().rank_error
+        if approximation:
+            self.data_description['meta']['approximation'] = approximation
+
+    def is_categorical(self, attribute_name):
+        if attribute_name in self.attr_to_is_categorical:
+            return self.attr_to_is_categorical[attribute_name]
+        else:
+            # distinct values are no longer tracked once there are more than category_threshold of them.
+            return self.attr_to_summary[attribute_name].value_counts is not None
+
+    def represent_input_dataset_by_columns(self):
+        self.attr_to_column = {}
+        for attr in self.df_input:
+            column = self.create_attribute(attr, self.df_input[attr].iloc[:0])
+            column.attach_summary(self.attr_to_summary[attr])
+            self.attr_to_column[attr] = column
+
+    def histogram_edges(self, column):
+        """Bin edges of equal frequency if quantiles of the attribute are sketched, otherwise of equal width."""
+        sketch = column.summary.quantile_sketch
+        if sketch is None or sketch.num_values == 0:
+            return column.histogram_edges()
+        quantiles = sketch.quantiles(np.linspace(0, 1, self.histogram_bins + 1)[1:-1])
+        edges = np.unique(np.concatenate([[column.min], np.clip(quantiles, column.min, column.max), [column.max]]))
+        return edges if edges.size > 1 else column.histogram_edges()
+
+    def count_dataset(self):
+        return self.count_chunks(self.read_chunks())
+
+    def infer_distributions(self):
+        for column in self.attr_to_column.values():
+            if not column.is_categorical:
+                column.summary.set_histogram_edges(self.histogram_edges(column))
+            # distribution bins do not depend on the histograms, so they are final before the second pass.
+            column.infer_distribution()
+
+        attr_to_histogram, self.df_encoded = self.count_dataset()
+        for attr, histogram in attr_to_histogram.items():
+            self.attr_to_column[attr].summary.histogram += histogram
+
+        for column in self.attr_to_column.values():
+            column.infer_distribution()
+
+    def encode_dataset_into_binning_indices(self):
+        """The dataset is encoded in the second pass over it."""
+        return self.df_encoded
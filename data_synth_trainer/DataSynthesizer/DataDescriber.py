@@ -1,18 +1,53 @@
 import json
+from multiprocessing.pool import Pool
 from typing import Dict, List, Union
 
-from numpy import array_equal
-from pandas import DataFrame, read_csv
+import numpy as np
+from pandas import CategoricalDtype, DataFrame, Series, concat, read_csv
+from pandas.api.types import union_categoricals
 
 from datatypes.AbstractAttribute import AbstractAttribute
-from datatypes.DateTimeAttribute import is_datetime, DateTimeAttribute
+from datatypes.DateTimeAttribute import is_datetime, infer_datetime_format, DateTimeAttribute
 from datatypes.FloatAttribute import FloatAttribute
 from datatypes.IntegerAttribute import IntegerAttribute
 from datatypes.SocialSecurityNumberAttribute import is_ssn, SocialSecurityNumberAttribute
 from datatypes.StringAttribute import StringAttribute
+from datatypes.utils.ColumnProfile import ColumnProfile, profile_column
 from datatypes.utils.DataType import DataType
 from lib import utils
-from lib.PrivBayes import greedy_bayes, construct_noisy_conditional_distributions
+from lib.PrivBayes import (greedy_bayes, add_counts, count_conditional_distributions,
+                           construct_noisy_conditional_distributions, get_edge_mutual_information,
+                           MutualInformationCache, SearchBudget, sample_encoded_dataset)
+
+
+def create_attribute(data_type: DataType, name: str, is_candidate_key, is_categorical, histogram_size, data,
+                     derived_values: Dict = None):
+    """Represent the values of an attribute by an AbstractAttribute of its data type.
+
+    derived_values are values derived from data by the constructor of a datetime or string attribute, as returned by
+    AbstractAttribute.derived_values, which are then not derived again.
+    """
+    paras = (name, is_candidate_key, is_categorical, histogram_size, data)
+    if data_type is DataType.INTEGER:
+        return IntegerAttribute(*paras)
+    elif data_type is DataType.FLOAT:
+        return FloatAttribute(*paras)
+    elif data_type is DataType.DATETIME:
+        return DateTimeAttribute(*paras, **(derived_values or {}))
+    elif data_type is DataType.STRING:
+        return StringAttribute(*paras, **(derived_values or {}))
+    elif data_type is DataType.SOCIAL_SECURITY_NUMBER:
+        return SocialSecurityNumberAttribute(*paras)
+    else:
+        raise Exception(f'The DataType of {name} is unknown.')
+
+
+def derive_values(data_type: DataType, name: str, histogram_size, data):
+    """Values the constructor of an attribute derives from data, e.g., the timestamps of datetimes, computed in a
+    worker process and sent back without the attribute itself.
+
+    """
+    return create_attribute(data_type, name, False, False, histogram_size, data).derived_values()
 
 
 class DataDescriber:
@@ -25,9 +60,18 @@ class DataDescriber:
         If it is a string such as 'auto' or 'fd', calculate the optimal bin width by `numpy.histogram_bin_edges`.
     category_threshold : int
         Categorical variables have no more than "this number" of distinct values.
+    processes : int
+        Number of worker processes parsing datetime attributes and measuring string attributes in parallel, each given
+        only the values of its own attribute. Workers send back the derived values but not the attribute, which is
+        built in the driver and keeps sharing its values with df_input. Other steps are cheaper than sending values
+        to a worker, so they run in the driver.
     null_values: str or list
         Additional strings to recognize as missing values.
         By default missing values already include {‘’, ‘NULL’, ‘N/A’, ‘NA’, ‘NaN’, ‘nan’}.
+    attr_to_dtype : dict
+        Dictionary of {attribute: dtype} to read the input dataset in, e.g., {"gender": "category", "age": "integer"}.
+        "category" reads a pandas categorical, "integer" the narrowest integer dtype holding the attribute. Other
+        attributes are read in the dtype inferred by pandas.
     attr_to_datatype : dict
         Dictionary of {attribute: datatype}, e.g., {"age": "Integer", "gender": "String"}.
     attr_to_is_categorical : dict
@@ -38,18 +82,36 @@ class DataDescriber:
         Nested dictionary (equivalent to JSON) recording the mined dataset information.
     df_input : DataFrame
         The input dataset to be analyzed.
+    attr_to_profile : Dict
+        Dictionary of {attribute: ColumnProfile}, from which data types, candidate keys and categorical attributes are
+        inferred.
     attr_to_column : Dict
         Dictionary of {attribute: AbstractAttribute}
     bayesian_network : list
         List of [child, [parent,]] to represent a Bayesian Network.
+    edge_mutual_information : list
+        Mutual information between every child of the Bayesian network and its parents, when the network was learned.
+        It is not differentially private, so it is saved with the noise-free counts rather than in the description.
+    edge_mutual_information_sampling : dict
+        Sample of rows edge_mutual_information was computed on, as {"sample_size": int, "stratify_by": str}, or None
+        if it was computed on all rows.
     df_encoded : DataFrame
         Input dataset encoded into integers, taken as input by PrivBayes algorithm in correlated attribute mode.
+    joint_counts : list
+        Noise-free joint counts of the encoded dataset from which conditional distributions are derived, as returned
+        by count_conditional_distributions.
+    seed : int
+        Seed of the description, from which the noise of every attribute is seeded.
     """
 
-    def __init__(self, histogram_bins: Union[int, str] = 20, category_threshold=20, null_values=None):
+    def __init__(self, histogram_bins: Union[int, str] = 20, category_threshold=20, null_values=None, processes=1,
+                 attribute_to_dtype: Dict[str, str] = None):
         self.histogram_bins: Union[int, str] = histogram_bins
         self.category_threshold: int = category_threshold
         self.null_values = null_values
+        self.attr_to_dtype: Dict[str, str] = attribute_to_dtype or {}
+        self.processes = processes
+        self.seed = 0
 
         self.attr_to_datatype: Dict[str, DataType] = None
         self.attr_to_is_categorical: Dict[str, bool] = None
@@ -57,9 +119,13 @@ class DataDescriber:
 
         self.data_description: Dict = {}
         self.df_input: DataFrame = None
+        self.attr_to_profile: Dict[str, ColumnProfile] = None
         self.attr_to_column: Dict[str, AbstractAttribute] = None
         self.bayesian_network: List = None
+        self.edge_mutual_information: List[float] = None
+        self.edge_mutual_information_sampling: Dict = None
         self.df_encoded: DataFrame = None
+        self.joint_counts: List = None
 
     def describe_dataset_in_random_mode(self,
                                         dataset_file: str,
@@ -80,22 +146,16 @@ class DataDescriber:
             categorical_attribute_to_domain = {}
 
         utils.set_random_seed(seed)
+        self.seed = seed
         self.attr_to_datatype = {attr: DataType(datatype) for attr, datatype in attribute_to_datatype.items()}
         self.attr_to_is_categorical = attribute_to_is_categorical
         self.attr_to_is_candidate_key = attribute_to_is_candidate_key
         self.read_dataset_from_csv(dataset_file)
+        self.profile_dataset()
         self.infer_attribute_data_types()
         self.analyze_dataset_meta()
         self.represent_input_dataset_by_columns()
-
-        for column in self.attr_to_column.values():
-            attr_name = column.name
-            if attr_name in categorical_attribute_to_domain:
-                column.infer_domain(categorical_domain=categorical_attribute_to_domain[attr_name])
-            elif attr_name in numerical_attribute_ranges:
-                column.infer_domain(numerical_range=numerical_attribute_ranges[attr_name])
-            else:
-                column.infer_domain()
+        self.infer_domains(categorical_attribute_to_domain, numerical_attribute_ranges)
 
         # record attribute information in json format
         self.data_description['attribute_description'] = {}
@@ -119,9 +179,7 @@ class DataDescriber:
                                              numerical_attribute_ranges,
                                              seed=seed)
 
-        for column in self.attr_to_column.values():
-            column.infer_distribution()
-
+        self.infer_distributions()
         self.inject_laplace_noise_into_distribution_per_attribute(epsilon)
         # record attribute information in json format
         self.data_description['attribute_description'] = {}
@@ -137,7 +195,15 @@ class DataDescriber:
                                                       attribute_to_is_candidate_key: Dict[str, bool] = None,
                                                       categorical_attribute_domain_file: str = None,
                                                       numerical_attribute_ranges: Dict[str, List] = None,
-                                                      seed=0):
+                                                      seed=0,
+                                                      bayesian_network: List = None,
+                                                      edge_mutual_information: List[float] = None,
+                                                      edge_mutual_information_sampling: Dict = None,
+                                                      drift_threshold: float = None,
+                                                      sample_size: int = None,
+                                                      stratify_by: str = None,
+                                                      time_budget: float = None,
+                                                      max_evaluations: int = None):
         """Generate dataset description using correlated attribute mode.
 
         Parameters
@@ -161,6 +227,28 @@ class DataDescriber:
             Dictionary of {attribute: [min, max]}, e.g., {"age": [25, 65]}
         seed : int or float
             Seed the random number generator.
+        bayesian_network : list
+            Bayesian network of an earlier description of the dataset, e.g., before rows were appended to it. It is
+            reused instead of searching a new one, unless its attributes differ or the dataset drifted from it.
+        edge_mutual_information : list
+            Mutual information of the edges of bayesian_network when it was learned, as saved with the counts of
+            its description.
+        edge_mutual_information_sampling : dict
+            Sample of rows edge_mutual_information was computed on, as saved with it. The drift is then checked on a
+            sample of the same size and stratification, as mutual information is biased by the number of rows.
+        drift_threshold : float
+            Search a new network if the mutual information of any edge of bayesian_network has decreased by more than
+            this fraction of edge_mutual_information. The check itself is not differentially private.
+        sample_size : int
+            Learn the Bayesian network on a sample of this many rows instead of all rows. Conditional distributions
+            are still computed over all rows. The sampling is recorded in the description, under structure_learning.
+        stratify_by : str
+            Attribute stratifying the sample, whose rare values would be missed by a uniform sample.
+        time_budget : float
+            Seconds the search of the Bayesian network may spend scoring candidates. Once they are spent, the remaining
+            attributes are attached to the best parents scored so far, and recorded under structure_learning.
+        max_evaluations : int
+            Number of mutual information evaluations the search may spend, as time_budget.
         """
         self.describe_dataset_in_independent_attribute_mode(dataset_file,
                                                             epsilon,
@@ -174,17 +262,155 @@ class DataDescriber:
         if self.df_encoded.shape[1] < 2:
             raise Exception("Correlated Attribute Mode requires at least 2 attributes(i.e., columns) in dataset.")
 
-        self.bayesian_network = greedy_bayes(self.df_encoded, k, epsilon / 2)
+        if bayesian_network is not None and self.is_reusable(bayesian_network, edge_mutual_information,
+                                                             drift_threshold, edge_mutual_information_sampling):
+            print('Reusing the given Bayesian network.')
+            self.bayesian_network = bayesian_network
+        else:
+            mi_cache = MutualInformationCache()
+            budget = (SearchBudget(time_budget, max_evaluations)
+                      if time_budget is not None or max_evaluations is not None else None)
+            self.bayesian_network = greedy_bayes(self.df_encoded, k, epsilon / 2, mi_cache, sample_size, stratify_by,
+                                                 budget)
+            self.edge_mutual_information = [mi_cache.mutual_information.get(mi_cache.key(child, parents))
+                                            for child, parents in self.bayesian_network]
+            if sample_size is not None and sample_size < self.df_encoded.shape[0]:
+                self.edge_mutual_information_sampling = {'sample_size': sample_size, 'stratify_by': stratify_by}
+            self.record_structure_learning(sample_size, stratify_by, budget)
         self.data_description['bayesian_network'] = self.bayesian_network
+        self.joint_counts = count_conditional_distributions(self.bayesian_network, self.df_encoded)
         self.data_description['conditional_probabilities'] = construct_noisy_conditional_distributions(
-            self.bayesian_network, self.df_encoded, epsilon / 2)
+            self.bayesian_network, self.df_encoded, epsilon / 2, self.joint_counts)
+
+    def record_structure_learning(self, sample_size=None, stratify_by=None, budget: SearchBudget = None):
+        """Record how the Bayesian network was learned in the description, if not on all rows without a budget."""
+        structure_learning = {}
+        num_tuples = self.df_encoded.shape[0]
+        if sample_size is not None and sample_size < num_tuples:
+            structure_learning.update({'sampling': 'uniform' if stratify_by is None else 'stratified',
+                                       'stratified_by': stratify_by,
+                                       'sample_size': sample_size,
+                                       'num_tuples': num_tuples})
+        if budget is not None:
+            structure_learning.update({'time_budget': budget.seconds,
+                                       'max_evaluations': budget.evaluations,
+                                       'num_evaluations': budget.num_evaluations,
+                                       'fallback_attributes': budget.fallback_attributes})
+        if structure_learning:
+            self.data_description['structure_learning'] = structure_learning
+
+    def is_reusable(self, bayesian_network, edge_mutual_information=None, drift_threshold=None,
+                    edge_mutual_information_sampling: Dict = None):
+        """Whether a Bayesian network still fits the encoded dataset, see describe_dataset_in_correlated_attribute_mode.
+
+        Sets edge_mutual_information and its sampling to those the drift of the network is checked against later on.
+        """
+        attributes = {bayesian_network[0][1][0]} | {child for child, _ in bayesian_network}
+        if attributes != set(self.df_encoded.columns):
+            print('The attributes of the given Bayesian network differ from the dataset, searching a new one.')
+            return False
+
+        if drift_threshold is None:
+            if edge_mutual_information:
+                self.edge_mutual_information = edge_mutual_information
+                self.edge_mutual_information_sampling = edge_mutual_information_sampling
+            else:
+                self.edge_mutual_information = get_edge_mutual_information(bayesian_network, self.df_encoded)
+            return True
+
+        if edge_mutual_information is None:
+            raise Exception('Checking the drift of a Bayesian network requires the mutual information of its edges.')
+        dataset = self.df_encoded
+        if edge_mutual_information_sampling is not None:
+            # on a sample of as many rows as the mutual information was computed on, to compare like with like.
+            dataset = sample_encoded_dataset(dataset, edge_mutual_information_sampling['sample_size'],
+                                             edge_mutual_information_sampling['stratify_by'])
+        current_mutual_information = get_edge_mutual_information(bayesian_network, dataset)
+        for (child, parents), mi, current_mi in zip(bayesian_network, edge_mutual_information,
+                                                    current_mutual_information):
+            # edges attached without scoring them, once a search budget was exhausted, have no mutual information.
+            if mi is not None and current_mi < mi * (1 - drift_threshold):
+                print(f'Mutual information of {child} and {parents} decreased from {mi:.4f} to {current_mi:.4f}, '
+                      f'searching a new Bayesian network.')
+                return False
+        self.edge_mutual_information = edge_mutual_information
+        self.edge_mutual_information_sampling = edge_mutual_information_sampling
+        return True
+
+    def refresh_dataset_description(self, description_file, counts_file, dataset_file, epsilon=0.1, seed=0):
+        """Fold the rows of dataset_file into a description, e.g., the rows appended to its dataset since it was
+        described, and inject noise into the refreshed distributions.
+
+        Only the new rows are read. They are counted into the domains and the Bayesian network of the description,
+        which are kept, and added to the noise-free counts saved with it by save_distribution_counts. New categorical
+        values count as missing values, and new numbers outside [min, max] count in the first or the last bin.
+
+        Parameters
+        ----------
+        description_file : str
+            File name of the description, in independent or correlated attribute mode.
+        counts_file : str
+            File name of the counts saved with the description.
+        dataset_file : str
+            File name of the new rows in csv format, with the same columns as the described dataset.
+        epsilon : float
+            A parameter in Differential Privacy, as in describe_dataset_in_correlated_attribute_mode.
+        seed : int or float
+            Seed the random number generator.
+        """
+        utils.set_random_seed(seed)
+        self.seed = seed
+        self.data_description = utils.read_json_file(description_file)
+        attr_to_json = self.data_description['attribute_description']
+        self.attr_to_datatype = {attr: DataType(attribute['data_type']) for attr, attribute in attr_to_json.items()}
+        self.attr_to_is_categorical = {attr: attribute['is_categorical'] for attr, attribute in attr_to_json.items()}
+        self.attr_to_is_candidate_key = {attr: attribute['is_candidate_key']
+                                         for attr, attribute in attr_to_json.items()}
+        self.read_dataset_from_csv(dataset_file)
+        if set(self.df_input.columns) != set(attr_to_json):
+            raise Exception(f'The columns of {dataset_file} differ from the attributes of {description_file}.')
+        self.represent_input_dataset_by_columns()
+
+        with np.load(counts_file) as counts:
+            header = json.loads(counts['header'].item())
+            num_tuples = header['num_tuples'] + self.df_input.shape[0]
+            for idx, attr in enumerate(header['attributes']):
+                column = self.attr_to_column[attr]
+                column.min = attr_to_json[attr]['min']
+                column.max = attr_to_json[attr]['max']
+                column.distribution_bins = np.array(attr_to_json[attr]['distribution_bins'])
+                column.distribution_probabilities = np.array(attr_to_json[attr]['distribution_probabilities'])
+                new_counts, num_missing = column.count_values_in_bins()
+                column.distribution_counts = counts[f'counts_{idx}'] + new_counts
+                column.distribution_probabilities = utils.normalize_given_distribution(column.distribution_counts)
+                column.num_tuples = num_tuples
+                column.missing_rate = (header['num_missing'][idx] + num_missing) / (num_tuples or 1)
+            joint_counts = [[attributes, counts[f'joint_counts_{idx}']]
+                            for idx, attributes in enumerate(header['joint_attributes'])]
+            self.edge_mutual_information = header.get('edge_mutual_information')
+            self.edge_mutual_information_sampling = header.get('edge_mutual_information_sampling')
+
+        self.data_description['meta']['num_tuples'] = num_tuples
+        self.inject_laplace_noise_into_distribution_per_attribute(epsilon)
+        for attr, column in self.attr_to_column.items():
+            self.data_description['attribute_description'][attr] = column.to_json()
+
+        if 'bayesian_network' in self.data_description:
+            self.bayesian_network = self.data_description['bayesian_network']
+            self.df_encoded = self.encode_dataset_into_binning_indices()
+            new_joint_counts = count_conditional_distributions(self.bayesian_network, self.df_encoded)
+            self.joint_counts = [[attributes, add_counts(stats, new_stats)]
+                                 for (attributes, stats), (_, new_stats) in zip(joint_counts, new_joint_counts)]
+            self.data_description['conditional_probabilities'] = construct_noisy_conditional_distributions(
+                self.bayesian_network, self.df_encoded, epsilon / 2, self.joint_counts)
 
     def read_dataset_from_csv(self, file_name=None):
         try:
-            self.df_input = read_csv(file_name, skipinitialspace=True, na_values=self.null_values)
+            self.df_input = self.read_csv_in_compact_dtypes(file_name)
         except (UnicodeDecodeError, NameError):
-            self.df_input = read_csv(file_name, skipinitialspace=True, na_values=self.null_values,
-                                     encoding='latin1')
+            self.df_input = self.read_csv_in_compact_dtypes(file_name, encoding='latin1')
+        # chunks of integers, with missing values in some of them, are concatenated into floats wider than needed.
+        self.downcast_integer_attributes(self.df_input)
 
         # Remove columns with empty active domain, i.e., all values are missing.
         attributes_before = set(self.df_input.columns)
@@ -193,26 +419,65 @@ class DataDescriber:
         if len(attributes_before) > len(attributes_after):
             print(f'Empty columns are removed, including {attributes_before - attributes_after}.')
 
+    def read_csv_in_compact_dtypes(self, file_name, encoding=None, chunk_size=100000):
+        """Read a CSV file in the dtypes of attr_to_dtype.
+
+        The range of integers is not known before reading them, so they are read in chunks of chunk_size rows, each
+        downcast before the chunks are concatenated. A whole column is then never held in int64 or float64.
+        """
+        kwargs = dict(skipinitialspace=True, na_values=self.null_values, dtype=self.csv_dtypes(), encoding=encoding)
+        if 'integer' not in self.attr_to_dtype.values():
+            return read_csv(file_name, **kwargs)
+
+        chunks = []
+        for chunk in read_csv(file_name, chunksize=chunk_size, **kwargs):
+            self.downcast_integer_attributes(chunk)
+            chunks.append(chunk)
+        if len(chunks) == 1:
+            return chunks[0]
+        columns = {}
+        for attr in chunks[0]:
+            parts = [chunk[attr] for chunk in chunks]
+            if isinstance(parts[0].dtype, CategoricalDtype):
+                # categories of the chunks differ, so they are united as read_csv would have sorted them.
+                columns[attr] = Series(union_categoricals(parts, sort_categories=True))
+            else:
+                columns[attr] = concat(parts, ignore_index=True)
+        return DataFrame(columns)
+
+    def csv_dtypes(self):
+        """dtypes passed to read_csv. Integers are downcast after reading, once their range is known."""
+        return {attr: dtype for attr, dtype in self.attr_to_dtype.items() if dtype == 'category'}
+
+    def downcast_integer_attributes(self, df: DataFrame):
+        for attr, dtype in self.attr_to_dtype.items():
+            if dtype == 'integer' and attr in df:
+                df[attr] = utils.downcast_integers(df[attr])
+
+    def profile_dataset(self):
+        """Profile every column of the input dataset in a single pass over it."""
+        self.attr_to_profile = {attr: profile_column(self.df_input[attr], self.category_threshold)
+                                for attr in self.df_input}
+
     def infer_attribute_data_types(self):
         attributes_with_unknown_datatype = set(self.df_input.columns) - set(self.attr_to_datatype)
-        inferred_numerical_attributes = utils.infer_numerical_attributes_in_dataframe(self.df_input)
 
         for attr in attributes_with_unknown_datatype:
-            column_dropna = self.df_input[attr].dropna()
+            profile = self.attr_to_profile[attr]
 
             # current attribute is either Integer or Float.
-            if attr in inferred_numerical_attributes:
-                # TODO Comparing all values may be too slow for large datasets.
-                if array_equal(column_dropna, column_dropna.astype(int, copy=False)):
+            if profile.is_numerical:
+                if profile.is_integral:
                     self.attr_to_datatype[attr] = DataType.INTEGER
                 else:
                     self.attr_to_datatype[attr] = DataType.FLOAT
 
             # current attribute is either String, DateTime, or SocialSecurityNumber.
             else:
-                # Sample 20 values to test its data_type.
-                samples = column_dropna.sample(20, replace=True)
-                if all(samples.map(is_datetime)):
+                # Sample 20 values to test its data_type, from a random state of their own, so that the random state
+                # of the description does not depend on the size of the column, e.g., of the first chunk only.
+                samples = self.df_input[attr].dropna().sample(20, replace=True, random_state=int(self.seed))
+                if infer_datetime_format(samples) or all(samples.map(is_datetime)):
                     self.attr_to_datatype[attr] = DataType.DATETIME
                 else:
                     if all(samples.map(is_ssn)):
@@ -225,7 +490,7 @@ class DataDescriber:
 
         # find all candidate keys.
         for attr in all_attributes - set(self.attr_to_is_candidate_key):
-            self.attr_to_is_candidate_key[attr] = self.df_input[attr].is_unique
+            self.attr_to_is_candidate_key[attr] = self.attr_to_profile[attr].is_unique
 
         candidate_keys = {attr for attr, is_key in self.attr_to_is_candidate_key.items() if is_key}
 
@@ -259,47 +524,125 @@ class DataDescriber:
         if attribute_name in self.attr_to_is_categorical:
             return self.attr_to_is_categorical[attribute_name]
         else:
-            return self.df_input[attribute_name].dropna().unique().size <= self.category_threshold
+            return self.attr_to_profile[attribute_name].num_distinct <= self.category_threshold
+
+    def map_attributes(self, function, tasks):
+        """Apply function to the arguments of every attribute in tasks, in worker processes if self.processes > 1.
+
+        Results are in the order of tasks, whatever the order in which workers finish. They are sent back from workers,
+        so function should return values derived from an attribute rather than the attribute itself.
+        """
+        if self.processes > 1 and len(tasks) > 1:
+            with Pool(min(self.processes, len(tasks))) as pool:
+                return pool.starmap(function, tasks, chunksize=1)
+        return [function(*task) for task in tasks]
 
     def represent_input_dataset_by_columns(self):
-        self.attr_to_column = {}
-        for attr in self.df_input:
-            data_type = self.attr_to_datatype[attr]
-            is_candidate_key = self.attr_to_is_candidate_key[attr]
-            is_categorical = self.attr_to_is_categorical[attr]
-            paras = (attr, is_candidate_key, is_categorical, self.histogram_bins, self.df_input[attr])
-            if data_type is DataType.INTEGER:
-                self.attr_to_column[attr] = IntegerAttribute(*paras)
-            elif data_type is DataType.FLOAT:
-                self.attr_to_column[attr] = FloatAttribute(*paras)
-            elif data_type is DataType.DATETIME:
-                self.attr_to_column[attr] = DateTimeAttribute(*paras)
-            elif data_type is DataType.STRING:
-                self.attr_to_column[attr] = StringAttribute(*paras)
-            elif data_type is DataType.SOCIAL_SECURITY_NUMBER:
-                self.attr_to_column[attr] = SocialSecurityNumberAttribute(*paras)
+        attr_to_derived_values = {}
+        if self.processes > 1:
+            attributes = [attr for attr in self.df_input
+                          if self.attr_to_datatype[attr] in {DataType.DATETIME, DataType.STRING}]
+            tasks = [(self.attr_to_datatype[attr], attr, self.histogram_bins, self.df_input[attr])
+                     for attr in attributes]
+            attr_to_derived_values = dict(zip(attributes, self.map_attributes(derive_values, tasks)))
+        # attributes are created in the driver, as views of df_input rather than copies sent back by workers.
+        self.attr_to_column = {attr: self.create_attribute(attr, self.df_input[attr], attr_to_derived_values.get(attr))
+                               for attr in self.df_input}
+
+    def create_attribute(self, attr, data, derived_values: Dict = None):
+        """Represent the values of an attribute by an AbstractAttribute of its data type.
+
+        Parameters
+        ----------
+        attr : str
+            Name of the attribute.
+        data : Series
+            Values of the attribute.
+        derived_values : dict
+            Values already derived from data, see create_attribute.
+        """
+        return create_attribute(self.attr_to_datatype[attr], attr, self.attr_to_is_candidate_key.get(attr, False),
+                                self.attr_to_is_categorical.get(attr, False), self.histogram_bins, data,
+                                derived_values)
+
+    def infer_domains(self, categorical_attribute_to_domain: Dict = None, numerical_attribute_ranges: Dict = None):
+        categorical_attribute_to_domain = categorical_attribute_to_domain or {}
+        numerical_attribute_ranges = numerical_attribute_ranges or {}
+        for attr, column in self.attr_to_column.items():
+            if attr in categorical_attribute_to_domain:
+                column.infer_domain(categorical_domain=categorical_attribute_to_domain[attr])
+            elif attr in numerical_attribute_ranges:
+                column.infer_domain(numerical_range=numerical_attribute_ranges[attr])
             else:
-                raise Exception(f'The DataType of {attr} is unknown.')
+                column.infer_domain()
+
+    def infer_distributions(self):
+        for column in self.attr_to_column.values():
+            column.infer_distribution()
 
     def inject_laplace_noise_into_distribution_per_attribute(self, epsilon=0.1):
+        """Inject noise into the distribution of every attribute, from a seed of its own."""
         num_attributes_in_BN = self.data_description['meta']['num_attributes_in_BN']
-        for column in self.attr_to_column.values():
+        seeds = utils.spawn_random_seeds(self.seed, len(self.attr_to_column))
+        for column, seed in zip(self.attr_to_column.values(), seeds):
             assert isinstance(column, AbstractAttribute)
-            column.inject_laplace_noise(epsilon, num_attributes_in_BN)
+            column.inject_laplace_noise(epsilon, num_attributes_in_BN, seed)
 
     def encode_dataset_into_binning_indices(self):
         """Before constructing Bayesian network, encode input dataset into binning indices."""
-        encoded_dataset = DataFrame()
-        for attr in self.data_description['meta']['attributes_in_BN']:
-            encoded_dataset[attr] = self.attr_to_column[attr].encode_values_into_bin_idx()
-        return encoded_dataset
+        attributes_in_BN = self.data_description['meta']['attributes_in_BN']
+        columns = [self.attr_to_column[attr].encode_values_into_bin_idx().to_numpy() for attr in attributes_in_BN]
+        return utils.stack_encoded_columns(columns, attributes_in_BN)
+
+    def finalize(self):
+        """Release the input dataset and the values held by attributes, once the dataset is described.
+
+        The description can still be saved and displayed, but the dataset cannot be described again without reading it.
+        """
+        if self.df_input is not None:
+            self.df_input = self.df_input.iloc[:0].copy()
+        self.df_encoded = None
+        for column in (self.attr_to_column or {}).values():
+            column.finalize()
+
+    @staticmethod
+    def read_edge_mutual_information(counts_file):
+        """Mutual information of the edges of a Bayesian network and the sample of rows it was computed on, saved by
+        save_distribution_counts. Either is None if not saved.
+
+        """
+        with np.load(counts_file) as counts:
+            header = json.loads(counts['header'].item())
+        return header.get('edge_mutual_information'), header.get('edge_mutual_information_sampling')
+
+    def save_distribution_counts(self, file_name):
+        """Save the noise-free counts behind the description into a .npz file, to refresh the description with new
+        rows by refresh_dataset_description.
+
+        The counts are not differentially private, so the file is as sensitive as the input dataset.
+        """
+        if any(column.distribution_counts is None for column in self.attr_to_column.values()):
+            raise Exception('Distributions are not inferred in random mode, so there are no counts to save.')
+
+        attributes = list(self.attr_to_column)
+        header = {'num_tuples': self.data_description['meta']['num_tuples'],
+                  'attributes': attributes,
+                  'num_missing': [round(self.attr_to_column[attr].missing_rate * self.attr_to_column[attr].num_tuples)
+                                  for attr in attributes],
+                  'joint_attributes': [family for family, _ in self.joint_counts or []],
+                  'edge_mutual_information': self.edge_mutual_information,
+                  'edge_mutual_information_sampling': self.edge_mutual_information_sampling}
+        counts = {f'counts_{idx}': self.attr_to_column[attr].distribution_counts for idx, attr in enumerate(attributes)}
+        for idx, (_, stats) in enumerate(self.joint_counts or []):
+            counts[f'joint_counts_{idx}'] = stats
+        np.savez_compressed(file_name, header=np.array(json.dumps(header, cls=utils.NumpyEncoder)), **counts)
 
     def save_dataset_description_to_file(self, file_name):
         with open(file_name, 'w') as outfile:
-            json.dump(self.data_description, outfile, indent=4)
+            json.dump(self.data_description, outfile, indent=4, cls=utils.NumpyEncoder)
 
     def display_dataset_description(self):
-        print(json.dumps(self.data_description, indent=4))
+        print(json.dumps(self.data_description, indent=4, cls=utils.NumpyEncoder))
 
 
 if __name__ == '__main__':
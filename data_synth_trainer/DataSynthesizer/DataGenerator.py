@@ -1,8 +1,26 @@
+from ast import literal_eval
+from collections import deque
+from multiprocessing.pool import Pool
+
+import numpy as np
 from numpy import random
 from pandas import DataFrame
 
 from datatypes.utils.AttributeLoader import parse_json
-from lib.utils import set_random_seed, read_json_file, generate_random_string
+from lib.utils import (set_random_seed, spawn_random_seeds, read_json_file, generate_random_strings,
+                       sample_from_distribution_rows)
+
+# Dataset description as seen by the worker processes of `DataGenerator.iter_batches`.
+_worker_description = None
+
+
+def init_worker(description):
+    global _worker_description
+    _worker_description = description
+
+
+def worker(paras):
+    return DataGenerator.generate_batch(_worker_description, *paras)
 
 
 class DataGenerator(object):
@@ -15,8 +33,117 @@ class DataGenerator(object):
     def generate_dataset_in_random_mode(self, n, description_file, seed=0):
         set_random_seed(seed)
         description = read_json_file(description_file)
+        self.synthetic_dataset = DataGenerator.generate_batch_in_random_mode(description, n, 0, n)
+
+    def generate_dataset_in_independent_mode(self, n, description_file, seed=0):
+        set_random_seed(seed)
+        self.description = read_json_file(description_file)
+        self.synthetic_dataset = DataGenerator.generate_batch_in_independent_mode(self.description, n, 0, n)
+
+    def generate_dataset_in_correlated_attribute_mode(self, n, description_file, seed=0):
+        set_random_seed(seed)
+        self.n = n
+        self.description = read_json_file(description_file)
+        self.encoded_dataset = DataGenerator.generate_encoded_dataset(self.n, self.description)
+        self.synthetic_dataset = DataGenerator.sample_batch_in_correlated_attribute_mode(self.description,
+                                                                                         self.encoded_dataset,
+                                                                                         n, 0, n)
+
+    def iter_batches(self, mode, n, description_file, batch_size=100000, seed=0, processes=1):
+        """Generate a synthetic dataset of n rows as a sequence of DataFrames of at most batch_size rows.
+
+        Only a few batches are held in memory at a time, so peak memory depends on batch_size instead of n. Every batch
+        is generated from its own seed, derived from seed and the position of the batch, so the output is identical
+        whatever the number of processes. The lengths of random strings that are the same for every row (see
+        draw_string_lengths) are drawn once from seed, so that they are the same in every batch.
+
+        Parameters
+        ----------
+        mode : str
+            One of 'random', 'independent' or 'correlated'.
+        n : int
+            Number of rows in the whole synthetic dataset.
+        description_file : str
+            File name of the dataset description.
+        batch_size : int
+            Maximum number of rows in each batch.
+        seed : int
+            Seed the random number generator.
+        processes : int
+            Number of worker processes generating batches in parallel.
+        """
+        self.n = n
+        self.description = read_json_file(description_file)
+
+        set_random_seed(seed)
+        attr_to_length = DataGenerator.draw_string_lengths(self.description)
+        starts = range(0, n, batch_size)
+        tasks = [(mode, n, start, min(start + batch_size, n), batch_seed, attr_to_length)
+                 for start, batch_seed in zip(starts, spawn_random_seeds(seed, len(starts)))]
+
+        if processes > 1:
+            with Pool(processes, initializer=init_worker, initargs=(self.description,)) as pool:
+                # keep a bounded number of batches in flight, in order.
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.apply_async(worker, (task,)))
+                    if len(pending) >= 2 * processes:
+                        yield pending.popleft().get()
+                while pending:
+                    yield pending.popleft().get()
+        else:
+            for task in tasks:
+                yield DataGenerator.generate_batch(self.description, *task)
+
+    @staticmethod
+    def draw_string_lengths(description):
+        """Length of the random strings of every string attribute whose random strings have the same length in all rows
+        of a synthetic dataset: the prefixes of candidate keys, and the values of non-categorical attributes in random
+        mode.
+        """
+        attr_to_length = {}
+        for attr, attr_info in description['attribute_description'].items():
+            if attr_info['data_type'] != 'String':
+                continue
+            minimum = attr_info['min']
+            maximum = attr_info['max']
+            if attr_info['is_candidate_key']:
+                attr_to_length[attr] = random.randint(minimum, maximum)
+            elif not attr_info['is_categorical']:
+                attr_to_length[attr] = minimum if minimum == maximum else random.randint(minimum, maximum)
+        return attr_to_length
+
+    @staticmethod
+    def generate_batch(description, mode, n, start, stop, seed, attr_to_length=None):
+        """Rows [start, stop) of a synthetic dataset of n rows, generated from seed.
+
+        attr_to_length holds the lengths drawn once for the whole dataset by draw_string_lengths.
+        """
+        set_random_seed(seed)
+        if mode == 'random':
+            return DataGenerator.generate_batch_in_random_mode(description, n, start, stop, attr_to_length)
+        elif mode == 'independent':
+            return DataGenerator.generate_batch_in_independent_mode(description, n, start, stop, attr_to_length)
+        elif mode == 'correlated':
+            encoded_dataset = DataGenerator.generate_encoded_dataset(stop - start, description)
+            return DataGenerator.sample_batch_in_correlated_attribute_mode(description, encoded_dataset, n, start, stop,
+                                                                           attr_to_length)
+        else:
+            raise Exception(f'The generation mode {mode} is unknown.')
 
-        self.synthetic_dataset = DataFrame()
+    @staticmethod
+    def generate_candidate_key(column, n, start, stop, attr_to_length=None):
+        """Rows [start, stop) of a candidate key, whose random prefix has the length in attr_to_length if given."""
+        if attr_to_length and column.name in attr_to_length:
+            return column.generate_values_as_candidate_key(n, start, stop, length=attr_to_length[column.name])
+        return column.generate_values_as_candidate_key(n, start, stop)
+
+    @staticmethod
+    def generate_batch_in_random_mode(description, n, start, stop, attr_to_length=None):
+        """Rows [start, stop) of a synthetic dataset of n rows in random mode."""
+        attr_to_length = attr_to_length or {}
+        size = stop - start
+        batch = {}
         for attr in description['attribute_description'].keys():
             attr_info = description['attribute_description'][attr]
             datatype = attr_info['data_type']
@@ -26,57 +153,62 @@ class DataGenerator(object):
             maximum = attr_info['max']
             static_num = attr_info['min'] if minimum == maximum else None
             if is_candidate_key:
-                self.synthetic_dataset[attr] = parse_json(attr_info).generate_values_as_candidate_key(n)
+                column = parse_json(attr_info)
+                batch[attr] = DataGenerator.generate_candidate_key(column, n, start, stop, attr_to_length)
             elif is_categorical:
-                self.synthetic_dataset[attr] = random.choice(attr_info['distribution_bins'], n)
+                batch[attr] = random.choice(attr_info['distribution_bins'], size)
             elif datatype == 'String':
-                length = static_num or random.randint(minimum, maximum)
-                self.synthetic_dataset[attr] = length
-                self.synthetic_dataset[attr] = self.synthetic_dataset[attr].map(lambda x: generate_random_string(x))
+                if attr in attr_to_length:
+                    length = attr_to_length[attr]
+                else:
+                    length = static_num or random.randint(minimum, maximum)
+                batch[attr] = generate_random_strings(np.full(size, length))
             else:
                 if datatype == 'Integer':
-                    self.synthetic_dataset[attr] = static_num or random.randint(minimum, maximum + 1, n)
+                    batch[attr] = static_num or random.randint(minimum, maximum + 1, size)
                 else:
-                    self.synthetic_dataset[attr] = static_num or random.uniform(minimum, maximum, n)
-
-    def generate_dataset_in_independent_mode(self, n, description_file, seed=0):
-        set_random_seed(seed)
-        self.description = read_json_file(description_file)
+                    batch[attr] = static_num or random.uniform(minimum, maximum, size)
+        return DataFrame(batch, index=range(size))
 
-        all_attributes = self.description['meta']['all_attributes']
-        candidate_keys = set(self.description['meta']['candidate_keys'])
-        self.synthetic_dataset = DataFrame(columns=all_attributes)
+    @staticmethod
+    def generate_batch_in_independent_mode(description, n, start, stop, attr_to_length=None):
+        """Rows [start, stop) of a synthetic dataset of n rows in independent attribute mode."""
+        all_attributes = description['meta']['all_attributes']
+        candidate_keys = set(description['meta']['candidate_keys'])
+        batch = DataFrame(columns=all_attributes)
         for attr in all_attributes:
-            attr_info = self.description['attribute_description'][attr]
+            attr_info = description['attribute_description'][attr]
             column = parse_json(attr_info)
 
             if attr in candidate_keys:
-                self.synthetic_dataset[attr] = column.generate_values_as_candidate_key(n)
+                batch[attr] = DataGenerator.generate_candidate_key(column, n, start, stop, attr_to_length)
             else:
-                binning_indices = column.sample_binning_indices_in_independent_attribute_mode(n)
-                self.synthetic_dataset[attr] = column.sample_values_from_binning_indices(binning_indices)
+                binning_indices = column.sample_binning_indices_in_independent_attribute_mode(stop - start)
+                batch[attr] = column.sample_values_from_binning_indices(binning_indices)
+        return batch
 
-    def generate_dataset_in_correlated_attribute_mode(self, n, description_file, seed=0):
-        set_random_seed(seed)
-        self.n = n
-        self.description = read_json_file(description_file)
+    @staticmethod
+    def sample_batch_in_correlated_attribute_mode(description, encoded_dataset, n, start, stop, attr_to_length=None):
+        """Rows [start, stop) of a synthetic dataset of n rows in correlated attribute mode.
 
-        all_attributes = self.description['meta']['all_attributes']
-        candidate_keys = set(self.description['meta']['candidate_keys'])
-        self.encoded_dataset = DataGenerator.generate_encoded_dataset(self.n, self.description)
-        self.synthetic_dataset = DataFrame(columns=all_attributes)
+        encoded_dataset holds the binning indices of the attributes in the BN for these rows.
+        """
+        all_attributes = description['meta']['all_attributes']
+        candidate_keys = set(description['meta']['candidate_keys'])
+        batch = DataFrame(columns=all_attributes)
         for attr in all_attributes:
-            attr_info = self.description['attribute_description'][attr]
+            attr_info = description['attribute_description'][attr]
             column = parse_json(attr_info)
 
-            if attr in self.encoded_dataset:
-                self.synthetic_dataset[attr] = column.sample_values_from_binning_indices(self.encoded_dataset[attr])
+            if attr in encoded_dataset:
+                batch[attr] = column.sample_values_from_binning_indices(encoded_dataset[attr])
             elif attr in candidate_keys:
-                self.synthetic_dataset[attr] = column.generate_values_as_candidate_key(n)
+                batch[attr] = DataGenerator.generate_candidate_key(column, n, start, stop, attr_to_length)
             else:
                 # for attributes not in BN or candidate keys, use independent attribute mode.
-                binning_indices = column.sample_binning_indices_in_independent_attribute_mode(n)
-                self.synthetic_dataset[attr] = column.sample_values_from_binning_indices(binning_indices)
+                binning_indices = column.sample_binning_indices_in_independent_attribute_mode(stop - start)
+                batch[attr] = column.sample_values_from_binning_indices(binning_indices)
+        return batch
 
     @staticmethod
     def get_sampling_order(bn):
@@ -86,39 +218,101 @@ class DataGenerator(object):
         return order
 
     @staticmethod
-    def generate_encoded_dataset(n, description):
-        bn = description['bayesian_network']
+    def get_attribute_cardinalities(bn, conditional_probabilities):
+        """Number of bin indices of every attribute in the BN, i.e., the length of its (conditional) distributions."""
         bn_root_attr = bn[0][1][0]
-        root_attr_dist = description['conditional_probabilities'][bn_root_attr]
-        encoded_df = DataFrame(columns=DataGenerator.get_sampling_order(bn))
-        encoded_df[bn_root_attr] = random.choice(len(root_attr_dist), size=n, p=root_attr_dist)
+        attr_to_cardinality = {bn_root_attr: len(conditional_probabilities[bn_root_attr])}
+        for child, _ in bn:
+            distributions = conditional_probabilities[child]
+            if isinstance(distributions, dict):
+                attr_to_cardinality[child] = len(next(iter(distributions.values())))
+            else:
+                attr_to_cardinality[child] = len(distributions[0])
+        return attr_to_cardinality
 
-        for child, parents in bn:
-            child_conditional_distributions = description['conditional_probabilities'][child]
-            for parents_instance in child_conditional_distributions.keys():
-                dist = child_conditional_distributions[parents_instance]
-                parents_instance = list(eval(parents_instance))
+    @staticmethod
+    def get_conditional_distributions(child, parents, conditional_probabilities, attr_to_cardinality):
+        """2-D array of the distributions of child, one row per mixed-radix code of its parents.
+
+        Rows of parent instances missing from the description are NaN.
+        """
+        distributions = conditional_probabilities[child]
+        if not isinstance(distributions, dict):
+            return np.array(distributions, dtype=float)
 
-                filter_condition = ''
-                for parent, value in zip(parents, parents_instance):
-                    filter_condition += f"(encoded_df['{parent}']=={value})&"
+        # descriptions saved before conditional distributions were stored as arrays, keyed by str([parent values]).
+        parent_cardinalities = [attr_to_cardinality[parent] for parent in parents]
+        table = np.full((int(np.prod(parent_cardinalities)), attr_to_cardinality[child]), np.nan)
+        for parents_instance, dist in distributions.items():
+            table[np.ravel_multi_index(literal_eval(parents_instance), parent_cardinalities)] = dist
+        return table
 
-                filter_condition = eval(filter_condition[:-1])
+    @staticmethod
+    def generate_encoded_dataset(n, description):
+        bn = description['bayesian_network']
+        conditional_probabilities = description['conditional_probabilities']
+        attr_to_cardinality = DataGenerator.get_attribute_cardinalities(bn, conditional_probabilities)
+        order = DataGenerator.get_sampling_order(bn)
+        attr_to_row = {attr: row for row, attr in enumerate(order)}
+        # bin indices of every attribute in a row of a single array, in the smallest dtype holding all of them.
+        dtype = np.min_scalar_type(max(attr_to_cardinality[attr] for attr in order) - 1)
+        encoded = np.empty((len(order), n), dtype=dtype)
+
+        root_attr_dist = conditional_probabilities[order[0]]
+        encoded[0] = random.choice(len(root_attr_dist), size=n, p=root_attr_dist)
 
-                size = encoded_df[filter_condition].shape[0]
-                if size:
-                    encoded_df.loc[filter_condition, child] = random.choice(len(dist), size=size, p=dist)
+        for child, parents in bn:
+            conditional_distributions = DataGenerator.get_conditional_distributions(child, parents,
+                                                                                    conditional_probabilities,
+                                                                                    attr_to_cardinality)
+            parents_codes = np.ravel_multi_index([encoded[attr_to_row[parent]] for parent in parents],
+                                                 [attr_to_cardinality[parent] for parent in parents])
+            missing_rows = np.isnan(conditional_distributions).any(axis=1)
+            conditional_distributions[missing_rows] = 1 / conditional_distributions.shape[1]
+            child_codes = encoded[attr_to_row[child]]
+            child_codes[:] = sample_from_distribution_rows(conditional_distributions, parents_codes)
 
-            unconditioned_distribution = description['attribute_description'][child]['distribution_probabilities']
-            encoded_df.loc[encoded_df[child].isnull(), child] = random.choice(len(unconditioned_distribution),
-                                                                              size=encoded_df[child].isnull().sum(),
-                                                                              p=unconditioned_distribution)
-        encoded_df[encoded_df.columns] = encoded_df[encoded_df.columns].astype(int)
-        return encoded_df
+            unconditioned = missing_rows[parents_codes]
+            if unconditioned.any():
+                unconditioned_distribution = description['attribute_description'][child]['distribution_probabilities']
+                child_codes[unconditioned] = random.choice(len(unconditioned_distribution),
+                                                           size=unconditioned.sum(),
+                                                           p=unconditioned_distribution)
+        return DataFrame(encoded.T, columns=order, copy=False)
 
     def save_synthetic_data(self, to_file):
         self.synthetic_dataset.to_csv(to_file, index=False)
 
+    def save_synthetic_data_in_batches(self, to_file, mode, n, description_file, batch_size=100000, seed=0,
+                                       processes=1):
+        """Generate a synthetic dataset batch by batch (see iter_batches) and append every batch to to_file.
+
+        The file is written as Parquet if its name ends with '.parquet' (which requires pyarrow), and as CSV otherwise.
+        """
+        batches = self.iter_batches(mode, n, description_file, batch_size, seed, processes)
+        if to_file.endswith('.parquet'):
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise Exception('Writing synthetic data to Parquet requires pyarrow.')
+
+            writer = None
+            try:
+                for batch in batches:
+                    if writer is None:
+                        table = pa.Table.from_pandas(batch, preserve_index=False)
+                        writer = pq.ParquetWriter(to_file, table.schema)
+                    else:
+                        table = pa.Table.from_pandas(batch, schema=writer.schema, preserve_index=False)
+                    writer.write_table(table)
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            for idx, batch in enumerate(batches):
+                batch.to_csv(to_file, index=False, mode='w' if idx == 0 else 'a', header=idx == 0)
+
 
 if __name__ == '__main__':
     from time import time
@@ -0,0 +1,95 @@
+from multiprocessing.pool import Pool
+from typing import Dict, List, Union
+
+import numpy as np
+
+from ChunkedDataDescriber import ChunkedDataDescriber
+from lib import utils
+
+
+def summarize_partition(paras):
+    describer, partition_file = paras
+    return describer.summarize_chunks(describer.read_chunks(partition_file))
+
+
+def count_partition(paras):
+    describer, partition_file = paras
+    return describer.count_chunks(describer.read_chunks(partition_file))
+
+
+class PartitionedDataDescriber(ChunkedDataDescriber):
+    """Describe a dataset stored as several CSV files of the same columns, e.g., the partitions of a table.
+
+    Every pass of ChunkedDataDescriber is mapped over the partitions by an executor, each partition being read in chunks
+    by a worker, and the attribute summaries of the partitions are merged into a single description. The description is
+    the same as if the partitions were concatenated into a single file, in order.
+
+    Attributes
+    ----------
+    partition_files : list
+        File names of the partitions.
+    executor
+        Any object whose map(function, iterable) applies a picklable function to every item, as multiprocessing.Pool
+        and concurrent.futures executors do. If None, a local pool of processes is created for every pass.
+    partition_processes : int
+        Number of processes of the local pool, given as processes. Defaults to the number of CPUs. Attributes are
+        described in the driver, as they hold no values.
+    """
+
+    def __init__(self, histogram_bins: Union[int, str] = 20, category_threshold=20, null_values=None,
+                 chunk_size=100000, approximate=False, executor=None, processes=None,
+                 attribute_to_dtype: Dict[str, str] = None, exact_keys=None):
+        super().__init__(histogram_bins, category_threshold, null_values, chunk_size, approximate, attribute_to_dtype,
+                         exact_keys)
+        self.partition_files: List[str] = None
+        self.executor = executor
+        self.partition_processes = processes
+
+    def __getstate__(self):
+        # workers read their own partitions, only the columns of the first chunk are needed.
+        state = self.__dict__.copy()
+        state['df_input'] = self.df_input.iloc[:0] if self.df_input is not None else None
+        state['df_encoded'] = None
+        state['executor'] = None
+        return state
+
+    def map_partitions(self, function):
+        tasks = [(self, partition_file) for partition_file in self.partition_files]
+        if self.executor is not None:
+            return list(self.executor.map(function, tasks))
+        with Pool(self.partition_processes) as pool:
+            return pool.map(function, tasks)
+
+    def read_dataset_from_csv(self, file_name=None):
+        """Read the first chunk of the first partition only, as df_input.
+
+        Parameters
+        ----------
+        file_name : list
+            File names of the partitions.
+        """
+        if isinstance(file_name, str):
+            file_name = [file_name]
+        self.partition_files = list(file_name)
+        super().read_dataset_from_csv(self.partition_files[0])
+
+    def summarize_dataset(self):
+        partition_summaries = self.map_partitions(summarize_partition)
+        self.attr_to_summary = partition_summaries[0]
+        for attr_to_summary in partition_summaries[1:]:
+            for attr, summary in attr_to_summary.items():
+                self.attr_to_summary[attr].merge(summary)
+
+    def count_dataset(self):
+        attr_to_histogram, encoded_partitions = {}, []
+        for partition_histograms, df_encoded in self.map_partitions(count_partition):
+            for attr, histogram in partition_histograms.items():
+                attr_to_histogram[attr] = attr_to_histogram.get(attr, 0) + histogram
+            if df_encoded is not None:
+                encoded_partitions.append(df_encoded)
+        if not encoded_partitions:
+            return attr_to_histogram, None
+        attributes_in_BN = list(encoded_partitions[0].columns)
+        columns = [np.concatenate([df_encoded[attr].to_numpy() for df_encoded in encoded_partitions])
+                   for attr in attributes_in_BN]
+        return attr_to_histogram, utils.stack_encoded_columns(columns, attributes_in_BN)
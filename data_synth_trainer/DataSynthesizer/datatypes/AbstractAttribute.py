@@ -1,18 +1,20 @@
 from abc import ABCMeta, abstractmethod
-from bisect import bisect_right
-from random import uniform
-from typing import List, Union
+from typing import Dict, List, Union
 
 import numpy as np
 from numpy.random import choice
-from pandas import Series
+from pandas import Categorical, CategoricalDtype, Series
 
 from datatypes.utils import DataType
+from datatypes.utils.AttributeSummary import AttributeSummary
 from lib import utils
 
 
 class AbstractAttribute(object):
     __metaclass__ = ABCMeta
+    __slots__ = ('name', 'is_candidate_key', 'is_categorical', 'histogram_size', 'data', 'data_dropna', 'missing_rate',
+                 'num_tuples', 'summary', 'is_numerical', 'data_type', 'min', 'max', 'distribution_bins',
+                 'distribution_probabilities', 'distribution_counts')
 
     def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series):
         self.name = name
@@ -20,8 +22,11 @@ class AbstractAttribute(object):
         self.is_categorical = is_categorical
         self.histogram_size: Union[int, str] = histogram_size
         self.data: Series = data
-        self.data_dropna: Series = self.data.dropna()
+        # without missing values, data_dropna shares the values of data instead of copying them.
+        self.data_dropna: Series = self.data.dropna() if self.data.hasnans else self.data
         self.missing_rate: float = (self.data.size - self.data_dropna.size) / (self.data.size or 1)
+        self.num_tuples: int = self.data.size
+        self.summary: AttributeSummary = None
 
         self.is_numerical: bool = None
         self.data_type: DataType = None
@@ -29,6 +34,8 @@ class AbstractAttribute(object):
         self.max = None
         self.distribution_bins: np.ndarray = None
         self.distribution_probabilities: np.ndarray = None
+        # noise-free counts of distribution_probabilities, once the distribution is inferred.
+        self.distribution_counts: np.ndarray = None
 
     @abstractmethod
     def infer_domain(self, categorical_domain: List = None, numerical_range: List = None):
@@ -43,10 +50,11 @@ class AbstractAttribute(object):
             self.min, self.max = numerical_range
             self.distribution_bins = np.array([self.min, self.max])
         else:
-            self.min = float(self.data_dropna.min())
-            self.max = float(self.data_dropna.max())
+            low, high = self.observed_range()
+            self.min = float(low)
+            self.max = float(high)
             if self.is_categorical:
-                self.distribution_bins = self.data_dropna.unique()
+                self.distribution_bins = self.observed_values()
             else:
                 self.distribution_bins = np.array([self.min, self.max])
 
@@ -55,23 +63,126 @@ class AbstractAttribute(object):
     @abstractmethod
     def infer_distribution(self):
         if self.is_categorical:
-            distribution = self.data_dropna.value_counts()
+            distribution = self.observed_value_counts()
             for value in set(self.distribution_bins) - set(distribution.index):
                 distribution[value] = 0
             distribution.sort_index(inplace=True)
+            self.distribution_counts = np.array(distribution)
             self.distribution_probabilities = utils.normalize_given_distribution(distribution)
             self.distribution_bins = np.array(distribution.index)
         else:
-            distribution = np.histogram(self.data_dropna, bins=self.histogram_size, range=(self.min, self.max))
+            distribution = self.observed_histogram()
             self.distribution_bins = distribution[1][:-1]  # Remove the last bin edge
+            self.distribution_counts = np.array(distribution[0])
             self.distribution_probabilities = utils.normalize_given_distribution(distribution[0])
 
-    def inject_laplace_noise(self, epsilon, num_valid_attributes):
+    def finalize(self):
+        """Release the values of the attribute once it is described and encoded, keeping only its description.
+
+        The attribute can still inject noise, be saved in JSON and sample values, but not infer its domain or
+        distribution, nor encode values, again.
+        """
+        # empty copies, as empty slices would keep the values alive.
+        self.data = self.data.iloc[:0].copy()
+        self.data_dropna = self.data_dropna.iloc[:0].copy()
+
+    def derived_values(self) -> Dict:
+        """Values the constructor derives from self.data besides data_dropna, by name of the keyword argument the
+        constructor takes them back in, instead of deriving them again.
+
+        """
+        return {}
+
+    def attach_summary(self, summary: AttributeSummary):
+        """Describe the attribute from the counts of a summary instead of self.data, e.g., when the dataset is read in
+        chunks. self.data may then be empty.
+
+        """
+        self.summary = summary
+        self.num_tuples = summary.num_tuples
+        self.missing_rate = summary.num_missing / (summary.num_tuples or 1)
+
+    def binning_values(self) -> Series:
+        """Non-missing values as they are binned into histograms, and whose range is [min, max]."""
+        return self.data_dropna
+
+    def observed_range(self):
+        """Minimum and maximum of the binning values, or NaN if there is none."""
+        if self.summary is not None:
+            low, high = self.summary.min, self.summary.max
+        else:
+            values = self.binning_values()
+            low, high = (values.min(), values.max()) if values.size else (None, None)
+        return (np.nan, np.nan) if low is None else (low, high)
+
+    def observed_values(self) -> np.ndarray:
+        """Distinct non-missing values."""
+        if self.summary is not None:
+            return self.summary.value_counts.index.to_numpy()
+        return np.asarray(self.data_dropna.unique())
+
+    def observed_value_counts(self) -> Series:
+        """Number of occurrences of every distinct non-missing value."""
+        if self.summary is not None:
+            return self.summary.value_counts.copy()
+        value_counts = self.data_dropna.value_counts()
+        if isinstance(value_counts.index.dtype, CategoricalDtype):
+            # categories missing from the data are counted as well, and only values of the categories can be added.
+            value_counts = value_counts[value_counts > 0]
+            value_counts.index = value_counts.index.astype(object)
+        return value_counts
+
+    def histogram_range(self):
+        return self.min, self.max
+
+    def histogram_edges(self) -> np.ndarray:
+        """Bin edges of the histogram of binning values, which do not depend on the values when the number of bins
+        is fixed.
+
+        """
+        return np.histogram_bin_edges(np.empty(0), bins=self.histogram_size, range=self.histogram_range())
+
+    def observed_histogram(self):
+        """Histogram of the binning values, as returned by np.histogram."""
+        if self.summary is not None:
+            return self.summary.histogram, self.summary.histogram_edges
+        return np.histogram(self.binning_values(), bins=self.histogram_size, range=self.histogram_range())
+
+    def distribution_edges(self) -> np.ndarray:
+        """Bin edges of the distribution of a non-categorical attribute, including the last right edge."""
+        return np.append(np.asarray(self.distribution_bins, dtype=float), self.max)
+
+    def count_values_in_bins(self):
+        """Count the values of self.data in the bins of the inferred distribution, as infer_distribution counts them.
+
+        Categorical values outside distribution_bins count as missing, as they are encoded for Bayesian networks.
+        Other values outside [min, max] count in the first or the last bin.
+
+        Returns
+        -------
+        (np.ndarray, int)
+            Number of values in every bin, and number of missing values.
+        """
+        num_bins = len(self.distribution_bins) if self.is_categorical else len(self.distribution_probabilities)
+        if self.is_categorical:
+            codes = self.encode_categories_into_bin_idx(self.data_dropna).to_numpy()
+            counts = np.bincount(codes, minlength=num_bins + 1)[:num_bins]
+        else:
+            edges = self.distribution_edges()
+            values = np.clip(self.binning_values().to_numpy(dtype=float), edges[0], edges[-1])
+            counts = np.histogram(values, bins=edges)[0]
+        return counts, self.data.size - int(counts.sum())
+
+    def inject_laplace_noise(self, epsilon, num_valid_attributes, seed=None):
+        """Inject Laplace noise into the distribution, drawn from a generator seeded by seed if it is not None.
+
+        """
         if epsilon > 0:
-            sensitivity = 2 / self.data.size
+            sensitivity = 2 / self.num_tuples
             privacy_budget = epsilon / num_valid_attributes
             noise_scale = sensitivity / privacy_budget
-            laplace_noises = np.random.laplace(0, scale=noise_scale, size=len(self.distribution_probabilities))
+            laplace = np.random.laplace if seed is None else np.random.RandomState(seed).laplace
+            laplace_noises = laplace(0, scale=noise_scale, size=len(self.distribution_probabilities))
             noisy_distribution = self.distribution_probabilities + laplace_noises
             self.distribution_probabilities = utils.normalize_given_distribution(noisy_distribution)
 
@@ -80,13 +191,36 @@ class AbstractAttribute(object):
 
         """
         if self.is_categorical:
-            value_to_bin_idx = {value: idx for idx, value in enumerate(self.distribution_bins)}
-            encoded = self.data.map(lambda x: value_to_bin_idx[x], na_action='ignore')
+            return self.encode_categories_into_bin_idx(self.data)
         else:
-            encoded = self.data.map(lambda x: bisect_right(self.distribution_bins, x) - 1, na_action='ignore')
+            return self.encode_numbers_into_bin_idx(self.data)
+
+    def bin_idx_dtype(self):
+        """Smallest unsigned integer dtype holding every bin index, including len(distribution_bins) for missing values.
+
+        """
+        return np.min_scalar_type(len(self.distribution_bins))
 
-        encoded.fillna(len(self.distribution_bins), inplace=True)
-        return encoded.astype(int, copy=False)
+    def encode_categories_into_bin_idx(self, values: Series):
+        """Encode categorical values into the indices of their bins, by categorical codes.
+
+        Missing values, as well as values outside the domain, are encoded as len(distribution_bins).
+        """
+        codes = Categorical(values, categories=self.distribution_bins).codes
+        encoded = np.where(codes < 0, len(self.distribution_bins), codes).astype(self.bin_idx_dtype())
+        return Series(encoded, index=values.index)
+
+    def encode_numbers_into_bin_idx(self, values: Series):
+        """Encode numerical values into the indices of the bins whose left edges they follow, by np.searchsorted.
+
+        Values below the first edge fall in the first bin. Missing values are encoded as len(distribution_bins).
+        """
+        numbers = values.to_numpy(dtype=float)
+        bins = np.asarray(self.distribution_bins, dtype=float)
+        encoded = np.searchsorted(bins, numbers, side='right') - 1
+        encoded = np.clip(encoded, 0, None)
+        encoded[np.isnan(numbers)] = bins.size
+        return Series(encoded.astype(self.bin_idx_dtype()), index=values.index)
 
     def to_json(self):
         """Encode attribution information in JSON format / Python dictionary.
@@ -103,11 +237,13 @@ class AbstractAttribute(object):
                 "distribution_probabilities": self.distribution_probabilities.tolist()}
 
     @abstractmethod
-    def generate_values_as_candidate_key(self, n):
+    def generate_values_as_candidate_key(self, n, start=0, stop=None):
         """When attribute should be a candidate key in output dataset.
 
+        Return the values of rows [start, stop) of an output dataset of n rows, so that batches generated separately
+        remain distinct.
         """
-        return np.arange(n)
+        return np.arange(start, n if stop is None else stop)
 
     def sample_binning_indices_in_independent_attribute_mode(self, n):
         """Sample an array of binning indices.
@@ -120,17 +256,24 @@ class AbstractAttribute(object):
         """Convert binning indices into values in domain. Used by both independent and correlated attribute mode.
 
         """
-        return binning_indices.apply(lambda x: self.uniform_sampling_within_a_bin(x))
+        return Series(self.uniform_sampling_within_bins(np.asarray(binning_indices)), index=binning_indices.index)
 
-    def uniform_sampling_within_a_bin(self, bin_idx: int):
+    def uniform_sampling_within_bins(self, bin_indices: np.ndarray):
+        """Sample one value per bin index: the bin itself for categorical attributes, otherwise a value drawn uniformly
+        between the bin edge and the next one (or self.max for the last bin). Index len(bins) is the missing value.
+
+        """
         num_bins = len(self.distribution_bins)
-        if bin_idx == num_bins:
-            return np.nan
-        elif self.is_categorical:
-            return self.distribution_bins[bin_idx]
-        elif bin_idx < num_bins - 1:
-            return uniform(self.distribution_bins[bin_idx], self.distribution_bins[bin_idx + 1])
-        else:
-            # sample from the last interval where the right edge is missing in self.distribution_bins
-            neg_2, neg_1 = self.distribution_bins[-2:]
-            return uniform(neg_1, self.max)
+        missing = bin_indices == num_bins
+        valid_indices = np.clip(bin_indices, 0, num_bins - 1)
+        if self.is_categorical:
+            values = np.asarray(self.distribution_bins, dtype=object)[valid_indices]
+            values[missing] = np.nan
+            return Series(values).infer_objects().to_numpy()
+
+        bins = np.asarray(self.distribution_bins, dtype=float)
+        # the right edge of the last interval is missing in self.distribution_bins
+        right_edges = np.append(bins[1:], self.max)
+        values = np.random.uniform(bins[valid_indices], right_edges[valid_indices])
+        values[missing] = np.nan
+        return values
@@ -1,9 +1,8 @@
-from bisect import bisect_right
 from typing import Union
 
 import numpy as np
 from dateutil.parser import parse
-from pandas import Series, concat
+from pandas import Series, factorize, to_datetime
 
 from datatypes.AbstractAttribute import AbstractAttribute
 from datatypes.utils.DataType import DataType
@@ -28,24 +27,80 @@ def is_datetime(value: str):
         return False
 
 
-# TODO detect datetime formats
+# Candidate formats of datetime strings, tried in order. Month-first comes before day-first, as in dateutil.
+DATETIME_FORMATS = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d',
+                    '%m/%d/%Y %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y',
+                    '%d-%m-%Y', '%d %b %Y', '%d %B %Y', '%b %d %Y', '%B %d %Y', '%Y%m%d']
+
+
+def infer_datetime_format(values: Series):
+    """Find the first format of DATETIME_FORMATS that parses all values, or None."""
+    for datetime_format in DATETIME_FORMATS:
+        try:
+            to_datetime(values, format=datetime_format)
+            return datetime_format
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def parse_timestamps(values: Series, sample_size=100):
+    """Convert datetime strings into int64 seconds since epoch.
+
+    Each distinct string is parsed once. The format is detected on a sample of them and applied to all of them in a
+    single vectorised conversion; strings that do not match it fall back to dateutil.
+
+    A single format is applied to the whole column, so ambiguous day-first strings (e.g., '03/04/2020' in a column
+    that also holds '25/04/2020') are read day-first consistently. Parsing each string with dateutil alone reads
+    them month-first, so descriptions of such columns differ from those made before.
+    """
+    codes, uniques = factorize(values)
+    uniques = Series(uniques)
+    sample = uniques.sample(min(sample_size, uniques.size), random_state=0)
+    datetime_format = infer_datetime_format(sample)
+    if datetime_format:
+        nanoseconds = to_datetime(uniques, format=datetime_format, errors='coerce').to_numpy(dtype='datetime64[ns]')
+        unparsed = np.isnat(nanoseconds)
+        nanoseconds = nanoseconds.astype(np.int64)
+        # round towards zero, as int(timedelta.total_seconds())
+        seconds = nanoseconds // 10 ** 9
+        seconds[(nanoseconds < 0) & (nanoseconds % 10 ** 9 != 0)] += 1
+    else:
+        unparsed = np.ones(uniques.size, dtype=bool)
+        seconds = np.zeros(uniques.size, dtype=np.int64)
+
+    epoch_datetime = parse('1970-01-01')
+    seconds[unparsed] = [int((parse(x) - epoch_datetime).total_seconds()) for x in uniques[unparsed]]
+    return Series(seconds[codes], index=values.index)
+
+
 class DateTimeAttribute(AbstractAttribute):
-    def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series):
+    __slots__ = ('timestamps',)
+
+    def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series,
+                 timestamps: Series = None):
         super().__init__(name, is_candidate_key, is_categorical, histogram_size, data)
         self.is_numerical = True
         self.data_type = DataType.DATETIME
-        epoch_datetime = parse('1970-01-01')
-        self.timestamps = self.data_dropna.map(lambda x: int((parse(x) - epoch_datetime).total_seconds()))
+        self.timestamps = parse_timestamps(self.data_dropna) if timestamps is None else timestamps
+
+    def derived_values(self):
+        return {'timestamps': self.timestamps}
+
+    def finalize(self):
+        super().finalize()
+        self.timestamps = self.timestamps.iloc[:0].copy()
 
     def infer_domain(self, categorical_domain=None, numerical_range=None):
         if numerical_range:
             self.min, self.max = numerical_range
             self.distribution_bins = np.array([self.min, self.max])
         else:
-            self.min = float(self.timestamps.min())
-            self.max = float(self.timestamps.max())
+            low, high = self.observed_range()
+            self.min = float(low)
+            self.max = float(high)
             if self.is_categorical:
-                self.distribution_bins = self.data_dropna.unique()
+                self.distribution_bins = self.observed_values()
             else:
                 self.distribution_bins = np.array([self.min, self.max])
 
@@ -53,34 +108,37 @@ class DateTimeAttribute(AbstractAttribute):
 
     def infer_distribution(self):
         if self.is_categorical:
-            distribution = self.data_dropna.value_counts()
+            distribution = self.observed_value_counts()
             for value in set(self.distribution_bins) - set(distribution.index):
                 distribution[value] = 0
             distribution.sort_index(inplace=True)
+            self.distribution_counts = np.array(distribution)
             self.distribution_probabilities = normalize_given_distribution(distribution)
             self.distribution_bins = np.array(distribution.index)
         else:
-            distribution = np.histogram(self.timestamps, bins=self.histogram_size, range=(self.min, self.max))
+            distribution = self.observed_histogram()
+            self.distribution_counts = np.array(distribution[0])
             self.distribution_probabilities = normalize_given_distribution(distribution[0])
 
+    def distribution_edges(self):
+        # distribution_bins keep [min, max], and the histogram has bins of equal width between them.
+        return np.linspace(self.min, self.max, len(self.distribution_probabilities) + 1)
+
+    def binning_values(self):
+        return self.timestamps
+
     def encode_values_into_bin_idx(self):
         """Encode values into bin indices for Bayesian Network construction.
 
         """
         if self.is_categorical:
-            value_to_bin_idx = {value: idx for idx, value in enumerate(self.distribution_bins)}
-            encoded = self.data.map(lambda x: value_to_bin_idx[x], na_action='ignore')
+            return self.encode_categories_into_bin_idx(self.data)
         else:
-            encoded = self.timestamps.map(lambda x: bisect_right(self.distribution_bins, x) - 1, na_action='ignore')
-            encoded = concat([encoded, self.data], axis=1).iloc[:, 0]
-
-        encoded.fillna(len(self.distribution_bins), inplace=True)
-        return encoded.astype(int, copy=False)
+            return self.encode_numbers_into_bin_idx(self.timestamps.reindex(self.data.index))
 
-    def generate_values_as_candidate_key(self, n):
-        return np.arange(self.min, self.max, (self.min - self.max) / n)
+    def generate_values_as_candidate_key(self, n, start=0, stop=None):
+        return self.min + np.arange(start, n if stop is None else stop) * ((self.max - self.min) / n)
 
     def sample_values_from_binning_indices(self, binning_indices):
         column = super().sample_values_from_binning_indices(binning_indices)
-        column[~column.isnull()] = column[~column.isnull()].astype(int)
-        return column
+        return np.trunc(column)
@@ -8,6 +8,8 @@ from datatypes.utils.DataType import DataType
 
 
 class FloatAttribute(AbstractAttribute):
+    __slots__ = ()
+
     def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series):
         super().__init__(name, is_candidate_key, is_categorical, histogram_size, data)
         self.is_numerical = True
@@ -19,8 +21,8 @@ class FloatAttribute(AbstractAttribute):
     def infer_distribution(self):
         super().infer_distribution()
 
-    def generate_values_as_candidate_key(self, n):
-        return arange(self.min, self.max, (self.max - self.min) / n)
+    def generate_values_as_candidate_key(self, n, start=0, stop=None):
+        return self.min + arange(start, n if stop is None else stop) * ((self.max - self.min) / n)
 
     def sample_values_from_binning_indices(self, binning_indices):
         return super().sample_values_from_binning_indices(binning_indices)
@@ -7,6 +7,8 @@ from datatypes.utils.DataType import DataType
 
 
 class IntegerAttribute(AbstractAttribute):
+    __slots__ = ()
+
     def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series):
         super().__init__(name, is_candidate_key, is_categorical, histogram_size, data)
         self.is_numerical = True
@@ -20,11 +22,9 @@ class IntegerAttribute(AbstractAttribute):
     def infer_distribution(self):
         super().infer_distribution()
 
-    def generate_values_as_candidate_key(self, n):
-        return super().generate_values_as_candidate_key(n)
+    def generate_values_as_candidate_key(self, n, start=0, stop=None):
+        return super().generate_values_as_candidate_key(n, start, stop)
 
     def sample_values_from_binning_indices(self, binning_indices):
         column = super().sample_values_from_binning_indices(binning_indices)
-        column = column.round()
-        column[~column.isnull()] = column[~column.isnull()].astype(int)
-        return column
+        return column.round()
@@ -38,6 +38,8 @@ class SocialSecurityNumberAttribute(AbstractAttribute):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series):
         super().__init__(name, is_candidate_key, is_categorical, histogram_size, pre_process(data))
         self.is_numerical = True
@@ -51,9 +53,10 @@ class SocialSecurityNumberAttribute(AbstractAttribute):
     def infer_distribution(self):
         super().infer_distribution()
 
-    def generate_values_as_candidate_key(self, n):
+    def generate_values_as_candidate_key(self, n, start=0, stop=None):
         if n < 1e9:
-            values = np.linspace(0, 1e9 - 1, num=n, dtype=int)
+            # rows [start, stop) of np.linspace(0, 1e9 - 1, num=n, dtype=int)
+            values = (np.arange(start, n if stop is None else stop) * ((1e9 - 1) / max(n - 1, 1))).astype(int)
             values = np.random.permutation(values)
             values = [str(i).zfill(9) for i in values]
             return ['{}-{}-{}'.format(i[:3], i[3:5], i[5:]) for i in values]
@@ -61,4 +64,5 @@ class SocialSecurityNumberAttribute(AbstractAttribute):
             raise Exception('The candidate key "{}" cannot generate more than 1e9 distinct values.', self.name)
 
     def sample_values_from_binning_indices(self, binning_indices):
-        return super().sample_binning_indices_in_independent_attribute_mode(binning_indices)
+        column = super().sample_values_from_binning_indices(binning_indices)
+        return column.round()
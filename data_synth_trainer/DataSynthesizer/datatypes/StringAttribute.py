@@ -13,11 +13,21 @@ class StringAttribute(AbstractAttribute):
 
     """
 
-    def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series):
+    __slots__ = ('data_dropna_len',)
+
+    def __init__(self, name: str, is_candidate_key, is_categorical, histogram_size: Union[int, str], data: Series,
+                 data_dropna_len: Series = None):
         super().__init__(name, is_candidate_key, is_categorical, histogram_size, data)
         self.is_numerical = False
         self.data_type = DataType.STRING
-        self.data_dropna_len = self.data_dropna.astype(str).map(len)
+        self.data_dropna_len = self.data_dropna.astype(str).map(len) if data_dropna_len is None else data_dropna_len
+
+    def derived_values(self):
+        return {'data_dropna_len': self.data_dropna_len}
+
+    def finalize(self):
+        super().finalize()
+        self.data_dropna_len = self.data_dropna_len.iloc[:0].copy()
 
     def infer_domain(self, categorical_domain=None, numerical_range=None):
         if categorical_domain:
@@ -27,12 +37,13 @@ class StringAttribute(AbstractAttribute):
             self.distribution_bins = np.array(categorical_domain)
         else:
             try:
-                self.min = int(self.data_dropna_len.min())
-                self.max = int(self.data_dropna_len.max())
+                low, high = self.observed_range()
+                self.min = int(low)
+                self.max = int(high)
             except:
                 print('Column contains no values!')
             if self.is_categorical:
-                self.distribution_bins = self.data_dropna.unique()
+                self.distribution_bins = self.observed_values()
             else:
                 self.distribution_bins = np.array([self.min, self.max])
 
@@ -40,25 +51,40 @@ class StringAttribute(AbstractAttribute):
 
     def infer_distribution(self):
         if self.is_categorical:
-            distribution = self.data_dropna.value_counts()
+            distribution = self.observed_value_counts()
             for value in set(self.distribution_bins) - set(distribution.index):
                 distribution[value] = 0
             distribution.sort_index(inplace=True)
+            self.distribution_counts = np.array(distribution)
             self.distribution_probabilities = utils.normalize_given_distribution(distribution)
             self.distribution_bins = np.array(distribution.index)
         else:
-            distribution = np.histogram(self.data_dropna_len, bins=self.histogram_size)
+            distribution = self.observed_histogram()
             self.distribution_bins = distribution[1][:-1]
+            self.distribution_counts = np.array(distribution[0])
             self.distribution_probabilities = utils.normalize_given_distribution(distribution[0])
 
-    def generate_values_as_candidate_key(self, n):
-        length = np.random.randint(self.min, self.max)
-        vectorized = np.vectorize(lambda x: '{}{}'.format(utils.generate_random_string(length), x))
-        return vectorized(np.arange(n))
+    def binning_values(self):
+        return self.data_dropna_len
+
+    def histogram_range(self):
+        # histograms of lengths span the observed lengths, whatever the domain.
+        low, high = self.observed_range()
+        return None if np.isnan(low) else (low, high)
+
+    def generate_values_as_candidate_key(self, n, start=0, stop=None, length=None):
+        # the length of the random prefixes is drawn once per dataset when it is generated in batches.
+        if length is None:
+            length = np.random.randint(self.min, self.max)
+        suffixes = np.arange(start, n if stop is None else stop).astype(str)
+        prefixes = utils.generate_random_strings(np.full(suffixes.size, length), as_bytes=True).astype(str)
+        return np.char.add(prefixes, suffixes)
 
     def sample_values_from_binning_indices(self, binning_indices):
         column = super().sample_values_from_binning_indices(binning_indices)
         if not self.is_categorical:
-            column[~column.isnull()] = column[~column.isnull()].apply(lambda x: utils.generate_random_string(int(x)))
+            lengths = column[~column.isnull()].astype(int)
+            column = column.astype(object)
+            column[lengths.index] = utils.generate_random_strings(lengths)
 
         return column
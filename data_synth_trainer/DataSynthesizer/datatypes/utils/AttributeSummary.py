@@ -0,0 +1,140 @@
+import numpy as np
+from pandas import Series
+from pandas.util import hash_pandas_object
+
+from lib.sketches import HyperLogLog, QuantileSketch
+
+
+class AttributeSummary(object):
+    """Counts of an attribute accumulated over chunks of a dataset, without keeping its values.
+
+    Chunks are passed in as attributes built from the values of the chunk, so that every data type derives its binning
+    values (numbers, timestamps or string lengths) as it does for a whole column.
+
+    Attributes
+    ----------
+    num_tuples : int
+        Number of values, including missing ones.
+    num_missing : int
+        Number of missing values.
+    min, max
+        Minimum and maximum of the binning values, None until one is seen.
+    value_counts : Series
+        Number of occurrences of every distinct non-missing value. None if distinct values are not tracked, or once
+        there are more than max_distinct of them.
+    max_distinct : int
+        Maximum number of distinct values to track. No limit if None.
+    hashes : list
+        64-bit hashes of all values seen so far, one array per chunk, to find exactly whether the attribute is unique.
+        They grow with the number of values. None unless uniqueness is tracked exactly, or once a duplicate is found.
+    distinct_sketch : HyperLogLog
+        Approximate number of distinct non-missing values, to find whether the attribute is unique in a fixed amount of
+        memory. None if uniqueness is not tracked, or is tracked exactly.
+    has_duplicates : bool
+        Whether a chunk contains the same value twice, which the distinct sketch does not miss.
+    quantile_sketch : QuantileSketch
+        Approximate quantiles of the binning values. None unless tracked.
+    histogram_edges : np.ndarray
+        Bin edges of the histogram of binning values, including the last right edge.
+    histogram : np.ndarray
+        Number of binning values in every bin.
+    """
+
+    def __init__(self, track_values=True, max_distinct=None, track_uniqueness=False, track_quantiles=False,
+                 exact_uniqueness=False):
+        self.num_tuples = 0
+        self.num_missing = 0
+        self.min = None
+        self.max = None
+        self.value_counts: Series = Series(dtype=np.int64) if track_values else None
+        self.max_distinct = max_distinct
+        self.hashes = [] if track_uniqueness and exact_uniqueness else None
+        self.distinct_sketch = HyperLogLog() if track_uniqueness and not exact_uniqueness else None
+        self.has_duplicates = False
+        self.quantile_sketch = QuantileSketch() if track_quantiles else None
+        self.histogram_edges: np.ndarray = None
+        self.histogram: np.ndarray = None
+
+    def update_domain(self, column):
+        """First pass: add the values of a chunk to the counts and the domain.
+
+        Parameters
+        ----------
+        column : AbstractAttribute
+            Attribute built from the values of the chunk.
+        """
+        self.num_tuples += column.data.size
+        self.num_missing += column.data.size - column.data_dropna.size
+
+        values = column.binning_values()
+        if values.size:
+            self.min = values.min() if self.min is None else min(self.min, values.min())
+            self.max = values.max() if self.max is None else max(self.max, values.max())
+
+        if self.value_counts is not None:
+            self.value_counts = self.value_counts.add(column.observed_value_counts(), fill_value=0).astype(np.int64)
+            if self.max_distinct is not None and self.value_counts.size > self.max_distinct:
+                self.value_counts = None
+
+        if self.hashes is not None:
+            hashes = hash_pandas_object(column.data, index=False).to_numpy()
+            if np.unique(hashes).size < hashes.size:
+                self.hashes = None
+            else:
+                self.hashes.append(hashes)
+
+        if self.distinct_sketch is not None and not self.has_duplicates:
+            hashes = hash_pandas_object(column.data_dropna, index=False).to_numpy()
+            self.has_duplicates = np.unique(hashes).size < hashes.size
+            self.distinct_sketch.update(hashes)
+
+        if self.quantile_sketch is not None:
+            self.quantile_sketch.update(values.to_numpy(dtype=float))
+
+    def merge(self, other: 'AttributeSummary'):
+        """Add the counts of another summary of the same attribute, e.g., of another partition of the dataset.
+
+        """
+        self.num_tuples += other.num_tuples
+        self.num_missing += other.num_missing
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+        if self.value_counts is not None and other.value_counts is not None:
+            self.value_counts = self.value_counts.add(other.value_counts, fill_value=0).astype(np.int64)
+            if self.max_distinct is not None and self.value_counts.size > self.max_distinct:
+                self.value_counts = None
+        else:
+            self.value_counts = None
+
+        if self.hashes is not None and other.hashes is not None:
+            self.hashes.extend(other.hashes)
+        else:
+            self.hashes = None
+
+        if self.distinct_sketch is not None and other.distinct_sketch is not None:
+            self.distinct_sketch.merge(other.distinct_sketch)
+            self.has_duplicates = self.has_duplicates or other.has_duplicates
+
+        if self.quantile_sketch is not None and other.quantile_sketch is not None:
+            self.quantile_sketch.merge(other.quantile_sketch)
+
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram += other.histogram
+
+    def is_unique(self):
+        if self.distinct_sketch is not None:
+            # unique unless the estimate falls short of the number of values by more than three standard errors.
+            num_values = self.num_tuples - self.num_missing
+            estimate = self.distinct_sketch.estimate()
+            return (not self.has_duplicates and self.num_missing <= 1
+                    and estimate >= num_values * (1 - 3 * self.distinct_sketch.relative_error))
+        if self.hashes is None:
+            return False
+        hashes = np.concatenate(self.hashes) if self.hashes else np.empty(0, dtype=np.uint64)
+        return np.unique(hashes).size == hashes.size
+
+    def set_histogram_edges(self, edges: np.ndarray):
+        self.histogram_edges = edges
+        self.histogram = np.zeros(edges.size - 1, dtype=np.int64)
@@ -0,0 +1,72 @@
+import numpy as np
+from pandas import Series, unique
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+
+class ColumnProfile(object):
+    """Statistics of a column, from which DataDescriber infers its data type, candidate keys and categorical attributes.
+
+    They are computed together by profile_column, with a single hash of the values for both uniqueness and the number
+    of distinct values.
+
+    Attributes
+    ----------
+    num_tuples : int
+        Number of values, including missing ones.
+    num_missing : int
+        Number of missing values.
+    is_numerical : bool
+        Whether the column has a numerical dtype.
+    is_integral : bool
+        Whether all non-missing values are integers. False for non-numerical columns.
+    is_unique : bool
+        Whether no value occurs twice, missing values included, as pandas.Series.is_unique.
+    num_distinct : int
+        Number of distinct non-missing values, counted exactly up to max_distinct. Any number greater than max_distinct
+        means "more than max_distinct".
+    min, max
+        Minimum and maximum of non-missing values of a numerical column, None otherwise.
+    """
+
+    def __init__(self):
+        self.num_tuples = 0
+        self.num_missing = 0
+        self.is_numerical = False
+        self.is_integral = False
+        self.is_unique = False
+        self.num_distinct = 0
+        self.min = None
+        self.max = None
+
+    @property
+    def null_rate(self):
+        return self.num_missing / (self.num_tuples or 1)
+
+
+def profile_column(column: Series, max_distinct=20, prefix_size=10000):
+    """Profile a column.
+
+    Distinct values are first counted on the first prefix_size values. If they already include both a duplicate and
+    more than max_distinct distinct values, the column is neither unique nor categorical, and the rest of it is not
+    hashed.
+    """
+    profile = ColumnProfile()
+    values = column.dropna().to_numpy()
+    profile.num_tuples = column.size
+    profile.num_missing = column.size - values.size
+
+    profile.is_numerical = is_numeric_dtype(column.dtype) and not is_bool_dtype(column.dtype)
+    if profile.is_numerical and values.size:
+        profile.min = values.min()
+        profile.max = values.max()
+        if values.dtype.kind in 'iu':
+            profile.is_integral = True
+        else:
+            profile.is_integral = bool(np.isfinite(values).all() and (values == np.trunc(values)).all())
+
+    num_distinct = unique(values[:prefix_size]).size
+    if values.size > prefix_size and not (num_distinct < prefix_size and num_distinct > max_distinct):
+        num_distinct = unique(values).size
+    profile.num_distinct = num_distinct
+    profile.is_unique = num_distinct == values.size and profile.num_missing <= 1
+    return profile
@@ -1,14 +1,19 @@
+import os
 import random
+import time
 import warnings
-from itertools import combinations, product, islice, chain
+from itertools import combinations
 from math import log, ceil
 from multiprocessing.pool import Pool
+from tempfile import TemporaryDirectory
+from typing import List
 
 import numpy as np
-from pandas import DataFrame, merge
+from pandas import DataFrame
 from scipy.optimize import fsolve
 
-from lib.utils import mutual_information, normalize_given_distribution
+from lib.utils import (encoded_array, mutual_information, normalize_given_distribution, normalize_distribution_rows,
+                       sample_row_indices)
 
 """
 This module is based on PrivBayes in the following paper:
@@ -102,41 +107,224 @@ def calculate_k(num_attributes, num_tuples, target_usefulness=4, epsilon=0.1):
         return ans
 
 
+# Encoded dataset and attribute cardinalities as seen by the worker processes of `greedy_bayes`.
+_worker_dataset: np.ndarray = None
+_worker_cardinalities: List[int] = None
+
+
+def init_worker(dataset_file, cardinalities):
+    """Attach a worker process to the encoded dataset published by `greedy_bayes`.
+
+    The dataset is memory-mapped read-only, so all workers share the same pages instead of receiving a pickled copy
+    with every task.
+    """
+    global _worker_dataset, _worker_cardinalities
+    _worker_dataset = np.load(dataset_file, mmap_mode='r')
+    _worker_cardinalities = cardinalities
+
+
 def worker(paras):
-    child, V, num_parents, split, dataset = paras
-    parents_pair_list = []
-    mutual_info_list = []
+    """Mutual information of a (child, parents) candidate, referred to by column indices in the published dataset."""
+    child, parents = paras
+    return mutual_information(_worker_dataset[child],
+                              _worker_dataset[list(parents)].T,
+                              _worker_cardinalities[child],
+                              [_worker_cardinalities[parent] for parent in parents])
+
+
+class MutualInformationCache(object):
+    """Mutual information of (child, parents) candidates, kept across the iterations of `greedy_bayes`.
+
+    The mutual information of a candidate does not depend on the order of its parents nor on the iteration it is
+    scored in, so every candidate is only computed once per structure search.
+
+    Attributes
+    ----------
+    hits : int
+        Number of candidates whose mutual information was already cached.
+    misses : int
+        Number of candidates that had to be scored.
+    """
 
-    if split + num_parents - 1 < len(V):
+    def __init__(self):
+        self.mutual_information = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(child, parents):
+        return child, frozenset(parents)
+
+    def __len__(self):
+        return len(self.mutual_information)
+
+    def __getitem__(self, pair):
+        child, parents = pair
+        return self.mutual_information[self.key(child, parents)]
+
+    def missing(self, pairs):
+        """Return the (child, parents) pairs that are not cached yet, counting hits and misses."""
+        missing_pairs = []
+        missing_keys = set()
+        for child, parents in pairs:
+            key = self.key(child, parents)
+            if key in self.mutual_information or key in missing_keys:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing_keys.add(key)
+                missing_pairs.append((child, parents))
+        return missing_pairs
+
+    def update(self, pairs, mutual_info_list):
+        for (child, parents), mi in zip(pairs, mutual_info_list):
+            self.mutual_information[self.key(child, parents)] = mi
+
+    def report(self):
+        print(f'Mutual information cache: {self.hits} hits, {self.misses} misses.')
+
+
+class SearchBudget(object):
+    """Time and number of mutual information evaluations that `greedy_bayes` may spend on scoring candidates.
+
+    Before every iteration, the search checks that scoring its candidates stays within the budget, estimating their
+    time from the evaluations so far. Once it would not, the remaining attributes are attached by
+    `attach_to_cached_parents`.
+
+    Attributes
+    ----------
+    seconds : float
+        Time budget in seconds, from the start of the search. No limit if None.
+    evaluations : int
+        Budget of mutual information evaluations. No limit if None.
+    num_evaluations : int
+        Number of evaluations spent.
+    fallback_attributes : list
+        Attributes attached once the budget was exhausted.
+    """
+
+    def __init__(self, seconds: float = None, evaluations: int = None):
+        self.seconds = seconds
+        self.evaluations = evaluations
+        self.start_time = None
+        self.num_evaluations = 0
+        self.fallback_attributes = []
+
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    def allows(self, num_evaluations):
+        """Whether num_evaluations more evaluations stay within the budget."""
+        if self.evaluations is not None and self.num_evaluations + num_evaluations > self.evaluations:
+            return False
+        if self.seconds is not None:
+            elapsed = time.perf_counter() - self.start_time
+            estimate = elapsed / self.num_evaluations * num_evaluations if self.num_evaluations else 0
+            if elapsed + estimate > self.seconds:
+                return False
+        return True
+
+    def spend(self, num_evaluations):
+        self.num_evaluations += num_evaluations
+
+
+def attach_to_cached_parents(attributes, V, mi_cache: MutualInformationCache, epsilon, attr_to_is_binary, num_tuples):
+    """Attach every attribute of attributes to parents from V without scoring any candidate.
+
+    The parents of an attribute are chosen among its candidates already in mi_cache, by the exponential mechanism if
+    epsilon, otherwise as the candidate of highest mutual information. An attribute without cached candidates is
+    attached to the last attribute of V.
+    """
+    num_attributes = len(V) + len(attributes)
+    attr_to_candidates = {attr: [] for attr in attributes}
+    V_set = set(V)
+    for child, parents in mi_cache.mutual_information:
+        if child in attr_to_candidates and parents <= V_set:
+            attr_to_candidates[child].append((child, [attr for attr in V if attr in parents]))
+
+    N = []
+    for attr in attributes:
+        parents_pair_list = attr_to_candidates[attr]
+        if not parents_pair_list:
+            N.append((attr, [V[-1]]))
+            continue
+        mutual_info_list = [mi_cache[pair] for pair in parents_pair_list]
+        if epsilon:
+            sampling_distribution = exponential_mechanism(epsilon, mutual_info_list, parents_pair_list,
+                                                          attr_to_is_binary, num_tuples, num_attributes)
+            idx = np.random.choice(list(range(len(mutual_info_list))), p=sampling_distribution)
+        else:
+            idx = mutual_info_list.index(max(mutual_info_list))
+        N.append(parents_pair_list[idx])
+    return N
+
+
+def candidate_parents(V, num_parents):
+    """All parent sets of size num_parents from V, in the order they were historically enumerated by split."""
+    for split in range(len(V) - num_parents + 1):
         for other_parents in combinations(V[split + 1:], num_parents - 1):
             parents = list(other_parents)
             parents.append(V[split])
-            parents_pair_list.append((child, parents))
-            # TODO consider to change the computation of MI by combined integers instead of strings.
-            mi = mutual_information(dataset[child], dataset[parents])
-            mutual_info_list.append(mi)
+            yield parents
+
 
-    return parents_pair_list, mutual_info_list
+def sample_encoded_dataset(dataset: DataFrame, sample_size: int, stratify_by: str = None):
+    """Sample of sample_size rows of an encoded dataset, stratified by the bin indices of stratify_by if given, as the
+    Bayesian network is learned on by greedy_bayes.
+
+    """
+    if stratify_by is not None and stratify_by not in dataset:
+        raise Exception(f'Cannot stratify the sample by {stratify_by}, which is not in the Bayesian network.')
+    strata = dataset[stratify_by].to_numpy() if stratify_by is not None else None
+    return dataset.iloc[sample_row_indices(dataset.shape[0], sample_size, strata)]
 
 
-def greedy_bayes(dataset: DataFrame, k: int, epsilon: float):
+def greedy_bayes(dataset: DataFrame, k: int, epsilon: float, mi_cache: MutualInformationCache = None,
+                 sample_size: int = None, stratify_by: str = None, budget: SearchBudget = None):
     """Construct a Bayesian Network (BN) using greedy algorithm.
 
+    The encoded dataset is published once to a pool of worker processes that lives for the whole search, and each
+    task only carries column indices. Candidates scored in earlier iterations are taken from `mi_cache`, so every
+    iteration only scores the parent sets that include the attribute added last. For k=1 without noise, the BN is the
+    maximum spanning tree of pairwise mutual information (see maximum_spanning_tree).
+
     Parameters
     ----------
     dataset : DataFrame
-        Input dataset, which only contains categorical attributes.
+        Input dataset encoded into binning indices, which only contains categorical attributes.
     k : int
         Maximum degree of the constructed BN. If k=0, k is automatically calculated.
     epsilon : float
         Parameter of differential privacy.
+    mi_cache : MutualInformationCache
+        Cache of mutual information scores. A new one is used if not given; pass one in to inspect its hit and miss
+        counts afterwards.
+    sample_size : int
+        If given, candidates are scored on a sample of this many rows, drawn without replacement (see
+        sample_row_indices), instead of all rows. The noise of the exponential mechanism is scaled to the sample.
+    stratify_by : str
+        Attribute whose bin indices stratify the sample. The sample is uniform if not given.
+    budget : SearchBudget
+        Time and evaluations the search may spend. Once they are exhausted, the remaining attributes are attached to
+        parents from mi_cache (see attach_to_cached_parents) and listed in budget.fallback_attributes. No limit if not
+        given.
     """
-    dataset: DataFrame = dataset.astype(str, copy=False)
     num_tuples, num_attributes = dataset.shape
     if not k:
         k = calculate_k(num_attributes, num_tuples)
-
-    attr_to_is_binary = {attr: dataset[attr].unique().size <= 2 for attr in dataset}
+    if mi_cache is None:
+        mi_cache = MutualInformationCache()
+    if sample_size is not None and sample_size < num_tuples:
+        dataset = sample_encoded_dataset(dataset, sample_size, stratify_by)
+        num_tuples = dataset.shape[0]
+        print(f'Scoring candidates on a sample of {num_tuples} rows.')
+
+    attributes = list(dataset.columns)
+    attr_to_idx = {attr: idx for idx, attr in enumerate(attributes)}
+    # One contiguous row per attribute, so that reading a column in the workers is a sequential scan.
+    encoded = encoded_array(dataset)
+    cardinalities = [int(codes.max()) + 1 if num_tuples else 1 for codes in encoded]
+    attr_to_is_binary = {attr: np.unique(encoded[attr_to_idx[attr]]).size <= 2 for attr in attributes}
 
     print('================ Constructing Bayesian Network (BN) ================')
     root_attribute = random.choice(dataset.columns)
@@ -145,35 +333,116 @@ def greedy_bayes(dataset: DataFrame, k: int, epsilon: float):
     rest_attributes.remove(root_attribute)
     print(f'Adding ROOT {root_attribute}')
     N = []
-    while rest_attributes:
-        parents_pair_list = []
-        mutual_info_list = []
-
-        num_parents = min(len(V), k)
-        tasks = [(child, V, num_parents, split, dataset) for child, split in
-                 product(rest_attributes, range(len(V) - num_parents + 1))]
-        with Pool() as pool:
-            res_list = pool.map(worker, tasks)
+    if budget is not None:
+        budget.start()
+
+    with TemporaryDirectory() as tmp_dir:
+        dataset_file = os.path.join(tmp_dir, 'encoded_dataset.npy')
+        np.save(dataset_file, encoded)
+        del encoded
+
+        processes = os.cpu_count() or 1
+        with Pool(processes, initializer=init_worker, initargs=(dataset_file, cardinalities)) as pool:
+            # the tree scores all pairs in a single map, so it is not taken under a budget.
+            if k == 1 and not epsilon and budget is None:
+                N = maximum_spanning_tree(pool, processes, attributes, root_attribute, mi_cache)
+            else:
+                while rest_attributes:
+                    num_parents = min(len(V), k)
+                    parents_pair_list = [(child, parents) for child in rest_attributes
+                                         for parents in candidate_parents(V, num_parents)]
+
+                    missing_pairs = mi_cache.missing(parents_pair_list)
+                    if budget is not None and not budget.allows(len(missing_pairs)):
+                        budget.fallback_attributes = [attr for attr in attributes if attr in rest_attributes]
+                        print(f'Search budget exhausted, attaching {budget.fallback_attributes} to cached parents.')
+                        N.extend(attach_to_cached_parents(budget.fallback_attributes, V, mi_cache, epsilon,
+                                                          attr_to_is_binary, num_tuples))
+                        break
+                    if budget is not None:
+                        budget.spend(len(missing_pairs))
+                    if missing_pairs:
+                        tasks = [(attr_to_idx[child], [attr_to_idx[parent] for parent in parents])
+                                 for child, parents in missing_pairs]
+                        chunksize = ceil(len(tasks) / (4 * processes))
+                        mi_cache.update(missing_pairs, pool.map(worker, tasks, chunksize))
+                    mutual_info_list = [mi_cache[pair] for pair in parents_pair_list]
+
+                    if epsilon:
+                        sampling_distribution = exponential_mechanism(epsilon, mutual_info_list, parents_pair_list,
+                                                                      attr_to_is_binary, num_tuples, num_attributes)
+                        idx = np.random.choice(list(range(len(mutual_info_list))), p=sampling_distribution)
+                    else:
+                        idx = mutual_info_list.index(max(mutual_info_list))
+
+                    N.append(parents_pair_list[idx])
+                    adding_attribute = parents_pair_list[idx][0]
+                    V.append(adding_attribute)
+                    rest_attributes.remove(adding_attribute)
+                    print(f'Adding attribute {adding_attribute}')
 
-        for res in res_list:
-            parents_pair_list += res[0]
-            mutual_info_list += res[1]
+    print('========================== BN constructed ==========================')
+    mi_cache.report()
 
-        if epsilon:
-            sampling_distribution = exponential_mechanism(epsilon, mutual_info_list, parents_pair_list, attr_to_is_binary,
-                                                          num_tuples, num_attributes)
-            idx = np.random.choice(list(range(len(mutual_info_list))), p=sampling_distribution)
-        else:
-            idx = mutual_info_list.index(max(mutual_info_list))
+    return N
 
-        N.append(parents_pair_list[idx])
-        adding_attribute = parents_pair_list[idx][0]
-        V.append(adding_attribute)
-        rest_attributes.remove(adding_attribute)
-        print(f'Adding attribute {adding_attribute}')
 
-    print('========================== BN constructed ==========================')
+def get_edge_mutual_information(bayesian_network, dataset: DataFrame):
+    """Mutual information between every child of a BN and its parents in an encoded dataset, in the order of the BN."""
+    num_tuples = dataset.shape[0]
+    attr_to_idx = {attr: idx for idx, attr in enumerate(dataset.columns)}
+    encoded = encoded_array(dataset)
+    cardinalities = [int(codes.max()) + 1 if num_tuples else 1 for codes in encoded]
+    edge_mutual_information = []
+    for child, parents in bayesian_network:
+        parents_idx = [attr_to_idx[parent] for parent in parents]
+        edge_mutual_information.append(mutual_information(encoded[attr_to_idx[child]], encoded[parents_idx].T,
+                                                          cardinalities[attr_to_idx[child]],
+                                                          [cardinalities[idx] for idx in parents_idx]))
+    return edge_mutual_information
+
+
+def maximum_spanning_tree(pool, processes, attributes, root_attribute, mi_cache: MutualInformationCache):
+    """Chow-Liu tree: the BN of degree 1 maximizing the sum of mutual information between children and parents, grown
+    from root_attribute by Prim's algorithm.
+
+    It is the BN that greedy_bayes constructs for k=1 without noise, as both add the attribute of highest mutual
+    information with an attribute of the BN at every step, up to ties. Here the mutual information of every pair of
+    attributes is scored once, in a single map over the pool of workers of greedy_bayes, and the tree is grown from
+    the matrix of scores.
+    """
+    num_attributes = len(attributes)
+    attr_to_idx = {attr: idx for idx, attr in enumerate(attributes)}
+    pairs = [(child, [parent]) for child, parent in combinations(attributes, 2)]
+    missing_pairs = mi_cache.missing(pairs)
+    if missing_pairs:
+        tasks = [(attr_to_idx[child], [attr_to_idx[parent]]) for child, (parent,) in missing_pairs]
+        mutual_info_list = pool.map(worker, tasks, ceil(len(tasks) / (4 * processes)))
+        # mutual information is symmetric.
+        mi_cache.update(missing_pairs, mutual_info_list)
+        mi_cache.update([(parent, [child]) for child, (parent,) in missing_pairs], mutual_info_list)
+
+    mutual_info_matrix = np.zeros((num_attributes, num_attributes))
+    for child, parents in pairs:
+        mutual_info_matrix[attr_to_idx[child], attr_to_idx[parents[0]]] = mi_cache[child, parents]
+    mutual_info_matrix += mutual_info_matrix.T
+
+    # highest mutual information of every attribute with an attribute of the tree, and that attribute.
+    root_idx = attr_to_idx[root_attribute]
+    best_mutual_info = mutual_info_matrix[root_idx].copy()
+    best_parent = np.full(num_attributes, root_idx)
+    in_tree = np.zeros(num_attributes, dtype=bool)
+    in_tree[root_idx] = True
 
+    N = []
+    for _ in range(num_attributes - 1):
+        child_idx = int(np.argmax(np.where(in_tree, -np.inf, best_mutual_info)))
+        N.append((attributes[child_idx], [attributes[best_parent[child_idx]]]))
+        print(f'Adding attribute {attributes[child_idx]}')
+        in_tree[child_idx] = True
+        closer = mutual_info_matrix[child_idx] > best_mutual_info
+        best_mutual_info[closer] = mutual_info_matrix[child_idx, closer]
+        best_parent[closer] = child_idx
     return N
 
 
@@ -196,81 +465,126 @@ def laplace_noise_parameter(k, num_attributes, num_tuples, epsilon):
     return 2 * (num_attributes - k) / (num_tuples * epsilon)
 
 
-def get_noisy_distribution_of_attributes(attributes, encoded_dataset, epsilon=0.1):
-    data = encoded_dataset.copy().loc[:, attributes]
-    data['count'] = 1
-    stats = data.groupby(attributes).sum()
-    
-    iterables = [range(int(encoded_dataset[attr].max()) + 1) for attr in attributes]
-    products = product(*iterables)
-
-    def grouper_it(iterable, n):
-        while True:
-            chunk_it = islice(iterable, n)
-            try:
-                first_el = next(chunk_it)
-            except StopIteration:
-                return
-            yield chain((first_el,), chunk_it)
-
-    full_space = None
-    for item in grouper_it(products, 1000000):
-        if full_space is None:
-            full_space = DataFrame(columns=attributes, data=list(item))
-        else:
-            data_frame_append = DataFrame(columns=attributes, data=list(item))
-            full_space.append(data_frame_append)
+def get_distribution_of_attributes(attributes, encoded_dataset):
+    """Noise-free joint counts of attributes, as a dense array with one axis per attribute.
+
+    Every row is mapped to its flat index in the joint domain by `np.ravel_multi_index`, so the counts are filled by a
+    single `np.bincount`. The domain of each attribute is [0, max bin index].
+    """
+    codes = tuple(encoded_dataset[attr].to_numpy() for attr in attributes)
+    shape = tuple(int(attr_codes.max()) + 1 if attr_codes.size else 1 for attr_codes in codes)
+    flat_codes = np.ravel_multi_index(codes, shape)
+    stats = np.bincount(flat_codes, minlength=int(np.prod(shape))).astype(float)
+    return stats.reshape(shape)
 
-    stats.reset_index(inplace=True)
-    stats = merge(full_space, stats, how='left')
-    stats.fillna(0, inplace=True)
 
+def inject_laplace_noise_into_counts(stats, num_tuples, num_attributes, epsilon=0.1):
+    """Noisy copy of the joint counts of k+1 attributes, clipped at 0."""
     if epsilon:
-        k = len(attributes) - 1
-        num_tuples, num_attributes = encoded_dataset.shape
+        k = stats.ndim - 1
         noise_para = laplace_noise_parameter(k, num_attributes, num_tuples, epsilon)
-        laplace_noises = np.random.laplace(0, scale=noise_para, size=stats.index.size)
-        stats['count'] += laplace_noises
-        stats.loc[stats['count'] < 0, 'count'] = 0
-
+        stats = stats + np.random.laplace(0, scale=noise_para, size=stats.shape)
+        np.maximum(stats, 0, out=stats)
     return stats
 
 
-def construct_noisy_conditional_distributions(bayesian_network, encoded_dataset, epsilon=0.1):
-    """See more in Algorithm 1 in PrivBayes."""
+def add_counts(counts, other_counts):
+    """Sum of two joint counts of the same attributes, whose domains may differ in size. Bin indices beyond the
+    domain of either of them count 0 in it.
 
-    k = len(bayesian_network[-1][1])
-    conditional_distributions = {}
+    """
+    shape = np.maximum(counts.shape, other_counts.shape)
+    total = np.zeros(shape)
+    total[tuple(slice(size) for size in counts.shape)] += counts
+    total[tuple(slice(size) for size in other_counts.shape)] += other_counts
+    return total
 
-    # first k+1 attributes
-    root = bayesian_network[0][1][0]
-    kplus1_attributes = [root]
+
+def marginalize(distribution, attributes, kept_attributes):
+    """Sum a joint distribution over all attributes but kept_attributes, with axes in the order of kept_attributes."""
+    summed_axes = tuple(idx for idx, attr in enumerate(attributes) if attr not in kept_attributes)
+    remaining_attributes = [attr for attr in attributes if attr in kept_attributes]
+    distribution = distribution.sum(axis=summed_axes)
+    return distribution.transpose([remaining_attributes.index(attr) for attr in kept_attributes])
+
+
+def get_kplus1_attributes(bayesian_network):
+    """The root and the first k children of a BN, whose joint distribution all first k conditional distributions are
+    marginalized from.
+
+    """
+    k = len(bayesian_network[-1][1])
+    kplus1_attributes = [bayesian_network[0][1][0]]
     for child, _ in bayesian_network[:k]:
         kplus1_attributes.append(child)
+    return kplus1_attributes
 
-    noisy_dist_of_kplus1_attributes = get_noisy_distribution_of_attributes(kplus1_attributes, encoded_dataset, epsilon)
+
+def count_conditional_distributions(bayesian_network, encoded_dataset):
+    """Noise-free joint counts from which construct_noisy_conditional_distributions derives the conditional
+    distributions of a BN.
+
+    Return
+    --------
+    list
+        List of [attributes, counts]: the first k+1 attributes of the BN, then the parents and child of every later
+        attribute. Counts of any other rows of the same attributes can be added to them by add_counts.
+    """
+    k = len(bayesian_network[-1][1])
+    families = [get_kplus1_attributes(bayesian_network)]
+    for child, parents in bayesian_network[k:]:
+        families.append(parents + [child])
+    return [[attributes, get_distribution_of_attributes(attributes, encoded_dataset)] for attributes in families]
+
+
+def construct_noisy_conditional_distributions(bayesian_network, encoded_dataset, epsilon=0.1, joint_counts=None):
+    """See more in Algorithm 1 in PrivBayes.
+
+    The distribution of the root is a 1-D array over its bin indices. The conditional distribution of every other
+    child is a row-normalised 2-D array: row r is the distribution of the child given the parents whose bin indices
+    have the mixed-radix code r (first parent most significant, see `np.ravel_multi_index`), and the radix of each
+    attribute is the length of its own distributions.
+
+    Parameters
+    ----------
+    bayesian_network : list
+        List of [child, [parent,]].
+    encoded_dataset : DataFrame
+        Input dataset encoded into binning indices.
+    epsilon : float
+        Parameter of differential privacy.
+    joint_counts : list
+        Joint counts as returned by count_conditional_distributions, e.g., accumulated over more rows than
+        encoded_dataset, in which case the noise is scaled to the number of rows they count. Counted from
+        encoded_dataset if not given.
+    """
+    num_tuples, num_attributes = encoded_dataset.shape
+    if joint_counts is None:
+        joint_counts = count_conditional_distributions(bayesian_network, encoded_dataset)
+    else:
+        num_tuples = int(joint_counts[0][1].sum())
+
+    k = len(bayesian_network[-1][1])
+    conditional_distributions = {}
+
+    # first k+1 attributes
+    kplus1_attributes, kplus1_counts = joint_counts[0]
+    noisy_dist_of_kplus1_attributes = inject_laplace_noise_into_counts(kplus1_counts, num_tuples, num_attributes,
+                                                                       epsilon)
 
     # generate noisy distribution of root attribute.
-    root_stats = noisy_dist_of_kplus1_attributes.loc[:, [root, 'count']].groupby(root).sum()['count']
-    conditional_distributions[root] = normalize_given_distribution(root_stats).tolist()
+    root = kplus1_attributes[0]
+    root_stats = marginalize(noisy_dist_of_kplus1_attributes, kplus1_attributes, [root])
+    conditional_distributions[root] = normalize_given_distribution(root_stats)
 
     for idx, (child, parents) in enumerate(bayesian_network):
-        conditional_distributions[child] = {}
-
         if idx < k:
-            stats = noisy_dist_of_kplus1_attributes.copy().loc[:, parents + [child, 'count']]
+            stats = marginalize(noisy_dist_of_kplus1_attributes, kplus1_attributes, parents + [child])
         else:
-            stats = get_noisy_distribution_of_attributes(parents + [child], encoded_dataset, epsilon)
+            stats = inject_laplace_noise_into_counts(joint_counts[idx - k + 1][1], num_tuples, num_attributes,
+                                                     epsilon)
 
-        stats = DataFrame(stats.loc[:, parents + [child, 'count']].groupby(parents + [child]).sum())
-
-        if len(parents) == 1:
-            for parent_instance in stats.index.levels[0]:
-                dist = normalize_given_distribution(stats.loc[parent_instance]['count']).tolist()
-                conditional_distributions[child][str([parent_instance])] = dist
-        else:
-            for parents_instance in product(*stats.index.levels[:-1]):
-                dist = normalize_given_distribution(stats.loc[parents_instance]['count']).tolist()
-                conditional_distributions[child][str(list(parents_instance))] = dist
+        stats = stats.reshape(-1, stats.shape[-1])
+        conditional_distributions[child] = normalize_distribution_rows(stats)
 
     return conditional_distributions
@@ -0,0 +1,121 @@
+import numpy as np
+
+
+class HyperLogLog(object):
+    """Estimate the number of distinct values of a stream in a fixed amount of memory.
+
+    Values are given as 64-bit hashes, e.g., by pandas.util.hash_pandas_object. Sketches of parts of a stream merge into
+    the sketch of the whole stream.
+
+    Attributes
+    ----------
+    precision : int
+        The sketch holds 2 ** precision registers of one byte.
+    registers : np.ndarray
+        Maximum rank of the hashes falling in every register.
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        """Standard error of the estimate, relative to the number of distinct values."""
+        return 1.04 / np.sqrt(self.registers.size)
+
+    def update(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        suffix_bits = 64 - self.precision
+        indices = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffixes = hashes & np.uint64((1 << suffix_bits) - 1)
+        # rank is the position of the first 1-bit in the suffix, i.e., its number of leading zeros plus one.
+        bit_lengths = np.frexp(suffixes.astype(float))[1]
+        ranks = (suffix_bits - bit_lengths + 1).astype(np.uint8)
+        np.maximum.at(self.registers, indices, ranks)
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        num_empty_registers = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and num_empty_registers:
+            # linear counting is more accurate for small cardinalities.
+            estimate = m * np.log(m / num_empty_registers)
+        return float(estimate)
+
+
+class QuantileSketch(object):
+    """Approximate quantiles of a stream of numbers in a bounded amount of memory, by a KLL sketch.
+
+    Compactors hold items of weight 2 ** level. A full compactor sorts its items and promotes every other one to the
+    next level, starting at a random offset. Capacities decrease geometrically from the top level down, so the sketch
+    holds O(k) items. Sketches of parts of a stream merge into a sketch of the whole stream.
+
+    Attributes
+    ----------
+    k : int
+        Capacity of the top compactor, which controls the accuracy.
+    num_values : int
+        Number of values in the stream.
+    compactors : list
+        Items held at every level.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.num_values = 0
+        self.compactors = [np.empty(0)]
+        self.random_state = np.random.RandomState(seed)
+
+    @property
+    def rank_error(self):
+        """Error of the normalized rank of a quantile, with 99% confidence, as measured for KLL sketches."""
+        return 2.296 / self.k ** 0.9723
+
+    def capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=float)
+        self.num_values += values.size
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self.compress()
+
+    def merge(self, other: 'QuantileSketch'):
+        self.num_values += other.num_values
+        for level, items in enumerate(other.compactors):
+            if level == len(self.compactors):
+                self.compactors.append(np.empty(0))
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.compress()
+
+    def compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if items.size >= self.capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # an odd item out stays at this level.
+                num_compacted = items.size - items.size % 2
+                promoted = items[self.random_state.randint(2):num_compacted:2]
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+                self.compactors[level] = items[num_compacted:]
+            level += 1
+
+    def quantiles(self, qs):
+        """Approximate quantiles of the stream, for every q in qs between 0 and 1."""
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(compactor.size, 2.0 ** level)
+                                  for level, compactor in enumerate(self.compactors)])
+        order = np.argsort(items, kind='stable')
+        items, cumulative_weights = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs, dtype=float) * cumulative_weights[-1]
+        positions = np.searchsorted(cumulative_weights, ranks, side='left')
+        return items[np.clip(positions, 0, items.size - 1)]
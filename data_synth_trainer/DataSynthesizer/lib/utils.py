@@ -1,10 +1,12 @@
 import json
 import random
 from string import ascii_lowercase
+from typing import List
 
 import numpy as np
-from pandas import Series, DataFrame
-from sklearn.metrics import mutual_info_score, normalized_mutual_info_score
+from pandas import DataFrame, Series, to_numeric
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from sklearn.metrics import normalized_mutual_info_score
 
 
 def set_random_seed(seed=0):
@@ -12,20 +14,104 @@ def set_random_seed(seed=0):
     np.random.seed(seed)
 
 
-def mutual_information(labels_x: Series, labels_y: DataFrame):
-    """Mutual information of distributions in format of Series or DataFrame.
+def spawn_random_seeds(seed, num_seeds):
+    """Derive num_seeds independent seeds from seed, e.g., one per chunk of work done in parallel."""
+    if hasattr(np.random, 'SeedSequence'):
+        children = np.random.SeedSequence(int(seed)).spawn(num_seeds)
+        return [int(child.generate_state(1)[0]) for child in children]
+    # numpy < 1.17 has no SeedSequence, so draw the seeds from a RandomState seeded by seed instead
+    rng = np.random.RandomState(int(seed) % 2 ** 32)
+    return [int(child) for child in rng.randint(2 ** 32, size=num_seeds, dtype=np.int64)]
+
+
+def joint_codes(columns: np.ndarray, cardinalities):
+    """Combine integer-coded columns into a single mixed-radix code per row.
 
     Parameters
     ----------
-    labels_x : Series
-    labels_y : DataFrame
+    columns : np.ndarray
+        2-D array of bin indices, one column per attribute.
+    cardinalities : list
+        Number of distinct bin indices of each column.
+
+    Return
+    --------
+    (np.ndarray, int)
+        Joint code of each row and the number of possible codes. Codes are compacted to the observed combinations
+        whenever the full radix would exceed the number of rows, so they never overflow int64.
+    """
+    num_rows = columns.shape[0]
+    codes = np.zeros(num_rows, dtype=np.int64)
+    size = 1
+    for idx, cardinality in enumerate(cardinalities):
+        codes *= cardinality
+        codes += columns[:, idx]
+        size *= cardinality
+        if size > max(num_rows, 1):
+            observed, codes = np.unique(codes, return_inverse=True)
+            codes = codes.astype(np.int64, copy=False)
+            size = observed.size
+    return codes, size
+
+
+def stack_encoded_columns(columns: List[np.ndarray], attributes: List[str]) -> DataFrame:
+    """DataFrame of the bin indices of attributes, backed by a single C-contiguous 2-D array.
+
+    The array has one row per attribute, so the bin indices of each attribute are contiguous, and the smallest dtype
+    holding the bin indices of all attributes.
     """
-    if labels_y.shape[1] == 1:
-        labels_y = labels_y.iloc[:, 0]
+    dtype = np.result_type(*[column.dtype for column in columns]) if columns else np.uint8
+    codes = np.empty((len(columns), len(columns[0]) if columns else 0), dtype=dtype)
+    for row, column in zip(codes, columns):
+        row[:] = column
+    return DataFrame(codes.T, columns=attributes, copy=False)
+
+
+def encoded_array(encoded_dataset: DataFrame) -> np.ndarray:
+    """The 2-D array of bin indices behind an encoded dataset, one row per attribute.
+
+    No copy is made for datasets built by stack_encoded_columns.
+    """
+    return np.ascontiguousarray(encoded_dataset.to_numpy().T)
+
+
+def mutual_information(labels_x: np.ndarray, labels_y: np.ndarray, cardinality_x: int, cardinalities_y):
+    """Mutual information (in nats) between integer-coded distributions.
+
+    Equivalent to `sklearn.metrics.mutual_info_score` on the same labels, but the contingency table is counted with
+    `np.bincount` over the bin indices instead of hashing one string per row.
+
+    Parameters
+    ----------
+    labels_x : np.ndarray
+        1-D array of bin indices.
+    labels_y : np.ndarray
+        2-D array of bin indices, one column per attribute.
+    cardinality_x : int
+        Number of distinct bin indices in labels_x.
+    cardinalities_y : list
+        Number of distinct bin indices of each column in labels_y.
+    """
+    num_rows = labels_x.size
+    if num_rows == 0:
+        return 0.0
+
+    codes_y, size_y = joint_codes(labels_y, cardinalities_y)
+    codes_x = labels_x.astype(np.int64, copy=False)
+    pair_codes = codes_x * size_y + codes_y
+    if cardinality_x * size_y <= 4 * num_rows:
+        joint = np.bincount(pair_codes, minlength=cardinality_x * size_y)
+        nonzero = joint.nonzero()[0]
+        joint = joint[nonzero]
     else:
-        labels_y = labels_y.apply(lambda x: ' '.join(x.values), axis=1)
+        nonzero, joint = np.unique(pair_codes, return_counts=True)
+
+    marginal_x = np.bincount(codes_x, minlength=cardinality_x)[nonzero // size_y]
+    marginal_y = np.bincount(codes_y, minlength=size_y)[nonzero % size_y]
 
-    return mutual_info_score(labels_x, labels_y)
+    joint = joint.astype(float)
+    mi = np.sum(joint * (np.log(joint * num_rows) - np.log(marginal_x * marginal_y.astype(float)))) / num_rows
+    return max(float(mi), 0.0)
 
 
 def pairwise_attributes_mutual_information(dataset):
@@ -53,19 +139,105 @@ def normalize_given_distribution(frequencies):
         return np.full_like(distribution, 1 / distribution.size)
 
 
+def normalize_distribution_rows(frequencies):
+    """Normalize every row of a 2-D array of frequencies into a distribution, as normalize_given_distribution does."""
+    distribution = np.array(frequencies, dtype=float)
+    distribution = distribution.clip(0)  # replace negative values with 0
+    summation = distribution.sum(axis=1)
+    infinite = np.isinf(summation)
+    distribution[infinite] = np.isinf(distribution[infinite])
+    summation[infinite] = distribution[infinite].sum(axis=1)
+
+    empty = summation <= 0
+    distribution[empty] = 1 / distribution.shape[1]
+    summation[empty] = 1
+    return distribution / summation[:, np.newaxis]
+
+
+def sample_from_distribution_rows(distributions, rows):
+    """Draw one bin index per element of rows, from the distribution in that row of a 2-D array of distributions.
+
+    All draws share a single uniform vector and are located by inverse-CDF lookup: every cumulative row r is offset
+    by r, so the concatenated rows are sorted and one `np.searchsorted` finds the bins of all draws.
+
+    Parameters
+    ----------
+    distributions : np.ndarray
+        Row-normalised 2-D array.
+    rows : np.ndarray
+        Row of distributions to sample from, for each draw.
+    """
+    num_rows, num_bins = distributions.shape
+    cumulative = np.cumsum(distributions, axis=1)
+    cumulative[:, -1] = 1  # guard against rounding errors
+    cumulative += np.arange(num_rows)[:, np.newaxis]
+    uniform = np.random.random(rows.size)
+    positions = np.searchsorted(cumulative.ravel(), rows + uniform, side='right')
+    return np.clip(positions - rows * num_bins, 0, num_bins - 1)
+
+
+class NumpyEncoder(json.JSONEncoder):
+    """Encode numpy arrays and scalars of a dataset description as JSON lists and numbers."""
+
+    def default(self, obj):
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        elif isinstance(obj, np.generic):
+            return obj.item()
+        return super().default(obj)
+
+
+def sample_row_indices(num_rows, sample_size, strata: np.ndarray = None):
+    """Indices of min(sample_size, num_rows) rows drawn without replacement, in increasing order.
+
+    Parameters
+    ----------
+    num_rows : int
+        Number of rows to sample from.
+    sample_size : int
+        Number of rows to draw.
+    strata : np.ndarray
+        Stratum of every row as a non-negative integer, e.g., the bin indices of an attribute. If given, every stratum
+        gets at least one row when sample_size allows it, and the rest of the sample is allotted to strata in
+        proportion to their sizes, by largest remainders. Otherwise rows are drawn uniformly.
+    """
+    if sample_size >= num_rows:
+        return np.arange(num_rows)
+    if strata is None:
+        return np.sort(np.random.choice(num_rows, sample_size, replace=False))
+
+    stratum_sizes = np.bincount(strata)
+    nonempty = stratum_sizes > 0
+    allocation = nonempty.astype(np.int64) if sample_size >= nonempty.sum() else np.zeros_like(stratum_sizes)
+    quotas = (sample_size - allocation.sum()) * (stratum_sizes - allocation) / (num_rows - allocation.sum())
+    allocation += np.floor(quotas).astype(np.int64)
+    remainders = quotas - np.floor(quotas)
+    allocation[np.argsort(-remainders, kind='stable')[:sample_size - allocation.sum()]] += 1
+
+    # a random permutation of the rows sorted by stratum, of which the first rows of every stratum are drawn.
+    permutation = np.random.permutation(num_rows)
+    order = permutation[np.argsort(strata[permutation], kind='stable')]
+    rank_in_stratum = np.arange(num_rows) - np.repeat(np.cumsum(stratum_sizes) - stratum_sizes, stratum_sizes)
+    return np.sort(order[rank_in_stratum < np.repeat(allocation, stratum_sizes)])
+
+
 def read_json_file(json_file):
     with open(json_file, 'r') as file:
         return json.load(file)
 
 
-def infer_numerical_attributes_in_dataframe(dataframe):
-    describe = dataframe.describe()
-    # DataFrame.describe() usually returns 8 rows.
-    if describe.shape[0] == 8:
-        return set(describe.columns)
-    # DataFrame.describe() returns less than 8 rows when there is no numerical attribute.
-    else:
-        return set()
+def downcast_integers(column: Series):
+    """Store integers in the narrowest integer dtype holding them.
+
+    Integers with missing values are stored as floats, in float32 if it holds all of them exactly. Non-numerical columns
+    are returned unchanged.
+    """
+    if not is_numeric_dtype(column.dtype) or is_bool_dtype(column.dtype):
+        return column
+    column = to_numeric(column, downcast='integer')
+    if column.dtype.kind == 'f':
+        column = to_numeric(column, downcast='float')
+    return column
 
 
 def display_bayesian_network(bn):
@@ -80,4 +252,30 @@ def display_bayesian_network(bn):
 
 
 def generate_random_string(length):
-    return ''.join(np.random.choice(list(ascii_lowercase), size=length))
+    return generate_random_strings([length])[0]
+
+
+def generate_random_strings(lengths, as_bytes=False):
+    """Generate one random lowercase string per length, from a single block of random bytes.
+
+    Parameters
+    ----------
+    lengths : array_like
+        Length of each string.
+    as_bytes : bool
+        Return a fixed-width bytes array (shorter strings padded with null bytes, which numpy strips on access) instead
+        of an object array of str.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    alphabet = np.frombuffer(ascii_lowercase.encode('ascii'), dtype=np.uint8)
+    if as_bytes:
+        width = max(int(lengths.max(initial=0)), 1)
+        block = alphabet[np.random.randint(0, alphabet.size, size=(lengths.size, width))]
+        block[np.arange(width) >= lengths[:, np.newaxis]] = 0
+        return block.view(f'S{width}').ravel()
+
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    block = alphabet[np.random.randint(0, alphabet.size, size=offsets[-1])].tobytes().decode('ascii')
+    strings = np.empty(lengths.size, dtype=object)
+    strings[:] = [block[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+    return strings
@@ -0,0 +1,77 @@
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from datatypes.DateTimeAttribute import DateTimeAttribute
+from datatypes.FloatAttribute import FloatAttribute
+from datatypes.IntegerAttribute import IntegerAttribute
+from datatypes.StringAttribute import StringAttribute
+
+
+def described(attribute):
+    attribute.infer_domain()
+    attribute.infer_distribution()
+    return attribute
+
+
+def bisect_encoding(bins, values):
+    """Bin indices as encoded before encoding was vectorised, one value at a time by bisect."""
+    return [len(bins) if pd.isnull(x) else bisect_right(list(bins), x) - 1 for x in values]
+
+
+@pytest.fixture
+def float_attribute():
+    data = pd.Series(np.random.RandomState(0).normal(50, 10, 500))
+    data[::25] = np.nan
+    return described(FloatAttribute('x', False, False, 20, data))
+
+
+def test_encode_numbers_equals_bisect(float_attribute):
+    encoded = float_attribute.encode_values_into_bin_idx()
+    assert encoded.tolist() == bisect_encoding(float_attribute.distribution_bins, float_attribute.data)
+    assert encoded.index.equals(float_attribute.data.index)
+
+
+def test_encode_numbers_on_bin_edges(float_attribute):
+    bins = float_attribute.distribution_bins
+    # a value on an edge falls in the bin that the edge starts.
+    values = pd.Series(np.append(bins, [float_attribute.max, np.nan]))
+    encoded = float_attribute.encode_numbers_into_bin_idx(values)
+    assert encoded.tolist() == bisect_encoding(bins, values)
+    assert encoded.tolist() == list(range(len(bins))) + [len(bins) - 1, len(bins)]
+
+
+def test_encode_numbers_outside_range(float_attribute):
+    bins = float_attribute.distribution_bins
+    values = pd.Series([float_attribute.min - 1, float_attribute.max + 1, -np.inf, np.inf])
+    encoded = float_attribute.encode_numbers_into_bin_idx(values)
+    # below the first edge, bisect gave -1, which is not a bin; such values now fall in the first bin.
+    assert bisect_encoding(bins, values) == [-1, len(bins) - 1, -1, len(bins) - 1]
+    assert encoded.tolist() == [0, len(bins) - 1, 0, len(bins) - 1]
+
+
+@pytest.mark.parametrize('attribute', [
+    IntegerAttribute('grade', False, True, 20, pd.Series([3, 1, np.nan, 2, 1, 3, np.nan, 2])),
+    StringAttribute('gender', False, True, 20, pd.Series(['M', 'F', None, 'F', 'X', 'M'])),
+])
+def test_encode_categories_equals_dict(attribute):
+    described(attribute)
+    value_to_bin_idx = {value: idx for idx, value in enumerate(attribute.distribution_bins)}
+    expected = [len(attribute.distribution_bins) if pd.isnull(x) else value_to_bin_idx[x] for x in attribute.data]
+    assert attribute.encode_values_into_bin_idx().tolist() == expected
+
+
+def test_encode_categories_outside_domain():
+    attribute = described(StringAttribute('gender', False, True, 20, pd.Series(['M', 'F', 'F'])))
+    # the dict raised a KeyError on values outside the domain, which are now encoded as missing values.
+    encoded = attribute.encode_categories_into_bin_idx(pd.Series(['F', 'X', None, 'M']))
+    assert encoded.tolist() == [0, 2, 2, 1]
+
+
+def test_encode_datetimes_equals_bisect():
+    data = pd.Series(['2020-01-01', '2020-03-15', None, '2021-06-30', '2020-03-15', '2020-12-31'])
+    attribute = described(DateTimeAttribute('joined', False, False, 20, data))
+    timestamps = attribute.timestamps.reindex(data.index)
+    assert attribute.encode_values_into_bin_idx().tolist() == bisect_encoding(attribute.distribution_bins, timestamps)
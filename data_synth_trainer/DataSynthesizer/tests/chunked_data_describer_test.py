@@ -0,0 +1,49 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ChunkedDataDescriber import ChunkedDataDescriber
+from DataDescriber import DataDescriber
+from lib.utils import NumpyEncoder
+
+
+@pytest.fixture
+def keys_file(tmp_path):
+    num_rows = 20000
+    near_key = np.arange(num_rows)
+    # a few duplicates, each in another chunk than its original value.
+    near_key[np.arange(50) * 293 + 5000] = np.arange(50)
+    file_name = tmp_path / 'keys.csv'
+    pd.DataFrame({'key': np.arange(num_rows), 'near_key': near_key,
+                  'group': np.arange(num_rows) % 7}).to_csv(file_name, index=False)
+    return str(file_name)
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'approximate': True, 'exact_keys': True}])
+def test_exact_candidate_keys(keys_file, kwargs):
+    describer = ChunkedDataDescriber(chunk_size=2000, **kwargs)
+    describer.describe_dataset_in_independent_attribute_mode(keys_file, epsilon=0)
+    assert describer.attr_to_is_candidate_key == {'key': True, 'near_key': False, 'group': False}
+    assert 'distinct_count_relative_error' not in describer.data_description['meta'].get('approximation', {})
+
+
+def test_approximate_candidate_keys(keys_file):
+    describer = ChunkedDataDescriber(chunk_size=2000, approximate=True)
+    describer.describe_dataset_in_independent_attribute_mode(keys_file, epsilon=0)
+    assert describer.attr_to_is_candidate_key['key']
+    assert not describer.attr_to_is_candidate_key['group']
+    assert describer.data_description['meta']['approximation']['distinct_count_relative_error'] > 0
+
+
+@pytest.mark.parametrize('mode', ['independent', 'correlated'])
+def test_chunked_description_equals_in_memory(dataset_file, mode):
+    descriptions = []
+    for describer in [DataDescriber(), ChunkedDataDescriber(chunk_size=70)]:
+        if mode == 'correlated':
+            describer.describe_dataset_in_correlated_attribute_mode(dataset_file, k=2, epsilon=0.1)
+        else:
+            describer.describe_dataset_in_independent_attribute_mode(dataset_file, epsilon=0.1)
+        descriptions.append(json.dumps(describer.data_description, cls=NumpyEncoder, sort_keys=True))
+    assert descriptions[0] == descriptions[1]
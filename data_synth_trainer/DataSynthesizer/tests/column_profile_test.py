@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from datatypes.utils.ColumnProfile import profile_column
+
+
+def test_profile_integral_floats():
+    profile = profile_column(pd.Series([1.0, 2.0, np.nan, 4.0]))
+    assert profile.is_numerical and profile.is_integral
+    assert profile.num_missing == 1
+    assert profile.null_rate == 0.25
+    assert (profile.min, profile.max) == (1.0, 4.0)
+    assert profile.num_distinct == 3
+    assert profile.is_unique
+
+
+def test_profile_strings():
+    profile = profile_column(pd.Series(['a', 'b', 'a', None]))
+    assert not profile.is_numerical and not profile.is_integral
+    assert profile.min is None
+    assert profile.num_distinct == 2
+    assert not profile.is_unique
+
+
+def test_profile_counts_distinct_values_beyond_prefix():
+    # the prefix holds no duplicate, so the whole column is hashed to count distinct values and find duplicates.
+    profile = profile_column(pd.Series(np.concatenate([np.arange(100), [0]])), max_distinct=20, prefix_size=50)
+    assert profile.num_distinct == 100
+    assert not profile.is_unique
+
+
+def test_profile_stops_hashing_high_cardinality_column():
+    values = np.concatenate([np.arange(40).repeat(2), np.arange(1000)])
+    profile = profile_column(pd.Series(values), max_distinct=20, prefix_size=80)
+    # more than max_distinct distinct values, whatever their exact number.
+    assert profile.num_distinct > 20
+    assert not profile.is_unique
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# modules of DataSynthesizer import each other from its directory, e.g., `from lib import utils`.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def make_dataset(num_rows=600, seed=0):
+    """Small dataset of every data type, with missing values and correlated attributes."""
+    random_state = np.random.RandomState(seed)
+    gender = random_state.choice(['F', 'M'], num_rows)
+    age = random_state.randint(18, 80, num_rows)
+    income = np.round(age * 500 + random_state.normal(0, 3000, num_rows), 2)
+    income[random_state.rand(num_rows) < 0.05] = np.nan
+    dates = pd.to_datetime('2020-01-01') + pd.to_timedelta(random_state.randint(0, 700, num_rows), unit='D')
+    return pd.DataFrame({'id': np.arange(num_rows),
+                         'gender': gender,
+                         'age': age,
+                         'grade': np.where(gender == 'F', age % 3, age % 4),
+                         'income': income,
+                         'joined': dates.strftime('%Y-%m-%d'),
+                         'notes': [''.join(random_state.choice(list('abcdef'), random_state.randint(3, 30)))
+                                   for _ in range(num_rows)]})
+
+
+@pytest.fixture
+def dataset_file(tmp_path):
+    file_name = tmp_path / 'dataset.csv'
+    make_dataset().to_csv(file_name, index=False)
+    return str(file_name)
@@ -0,0 +1,130 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from DataDescriber import DataDescriber
+from lib.PrivBayes import get_edge_mutual_information
+from lib.utils import NumpyEncoder
+from conftest import make_dataset
+
+
+def description_json(describer):
+    return json.dumps(describer.data_description, cls=NumpyEncoder, sort_keys=True)
+
+
+def test_describe_in_parallel_equals_serial(dataset_file):
+    descriptions = []
+    for processes in [1, 2]:
+        describer = DataDescriber(processes=processes)
+        describer.describe_dataset_in_correlated_attribute_mode(dataset_file, k=2, epsilon=0.1)
+        descriptions.append(description_json(describer))
+        # attributes are built in the driver, as views of the input dataset.
+        for attr, column in describer.attr_to_column.items():
+            assert np.shares_memory(column.data.to_numpy(), describer.df_input[attr].to_numpy())
+    assert descriptions[0] == descriptions[1]
+
+
+def test_read_integers_in_chunks_of_compact_dtypes(tmp_path):
+    file_name = tmp_path / 'integers.csv'
+    values = np.arange(100)
+    pd.DataFrame({'small': values % 5,
+                  # fits in int8 in the first chunks only.
+                  'wide': values * 1000,
+                  'missing': np.where(values % 30 == 29, np.nan, values),
+                  'gender': np.where(values < 60, 'F', np.where(values < 90, 'M', 'X')),
+                  'notes': values.astype(str)}).to_csv(file_name, index=False)
+    attribute_to_dtype = {'small': 'integer', 'wide': 'integer', 'missing': 'integer', 'gender': 'category'}
+    describer = DataDescriber(attribute_to_dtype=attribute_to_dtype)
+    chunked = describer.read_csv_in_compact_dtypes(str(file_name), chunk_size=20)
+    describer.downcast_integer_attributes(chunked)
+    whole = pd.read_csv(file_name, dtype={'gender': 'category'})
+    describer.downcast_integer_attributes(whole)
+
+    pd.testing.assert_frame_equal(chunked, whole)
+    assert chunked['small'].dtype == np.int8
+    assert chunked['wide'].dtype == np.int32
+    assert chunked['missing'].dtype == np.float32
+    assert chunked['gender'].cat.categories.tolist() == ['F', 'M', 'X']
+
+
+def test_refresh_without_noise_equals_describing_all_rows(tmp_path):
+    dataset = make_dataset()
+    # the described rows span the domain of every attribute, as domains are kept on refresh.
+    extremes = set()
+    for values in [dataset['id'], dataset['age'], dataset['income'], pd.to_datetime(dataset['joined']),
+                   dataset['notes'].str.len()]:
+        extremes.update([values.idxmin(), values.idxmax()])
+    is_new = (dataset.index % 3 == 0) & ~dataset.index.isin(extremes)
+    old_file, new_file, all_file = tmp_path / 'old.csv', tmp_path / 'new.csv', tmp_path / 'all.csv'
+    dataset[~is_new].to_csv(old_file, index=False)
+    dataset[is_new].to_csv(new_file, index=False)
+    pd.concat([dataset[~is_new], dataset[is_new]]).to_csv(all_file, index=False)
+
+    describer = DataDescriber()
+    describer.describe_dataset_in_correlated_attribute_mode(str(old_file), k=2, epsilon=0)
+    describer.save_dataset_description_to_file(str(tmp_path / 'description.json'))
+    describer.save_distribution_counts(str(tmp_path / 'counts.npz'))
+
+    refreshed = DataDescriber()
+    refreshed.refresh_dataset_description(str(tmp_path / 'description.json'), str(tmp_path / 'counts.npz'),
+                                          str(new_file), epsilon=0)
+    described = DataDescriber()
+    described.describe_dataset_in_correlated_attribute_mode(str(all_file), k=2, epsilon=0,
+                                                            bayesian_network=describer.bayesian_network)
+
+    refreshed_json = json.loads(description_json(refreshed))
+    described_json = json.loads(description_json(described))
+    assert refreshed_json['meta']['num_tuples'] == described_json['meta']['num_tuples'] == len(dataset)
+    for field in ['attribute_description', 'bayesian_network', 'conditional_probabilities']:
+        assert refreshed_json[field] == described_json[field]
+
+
+def describe_correlated(dataset_file, **kwargs):
+    describer = DataDescriber()
+    describer.describe_dataset_in_correlated_attribute_mode(dataset_file, k=2, epsilon=0, **kwargs)
+    return describer
+
+
+def test_reuse_network_that_did_not_drift(dataset_file):
+    searched = describe_correlated(dataset_file)
+    # a network that differs from the one a search finds, to tell reusing from searching.
+    network = [('income', ['joined']), ('age', ['income', 'joined']), ('grade', ['age', 'income']),
+               ('gender', ['age', 'income'])]
+    assert network != searched.bayesian_network
+    edge_mutual_information = get_edge_mutual_information(network, searched.df_encoded)
+
+    reused = describe_correlated(dataset_file, bayesian_network=network,
+                                 edge_mutual_information=edge_mutual_information, drift_threshold=0.1)
+    assert reused.bayesian_network == network
+    assert reused.edge_mutual_information == edge_mutual_information
+
+
+def test_search_new_network_once_drifted(tmp_path, dataset_file):
+    previous = describe_correlated(dataset_file)
+    dataset = make_dataset()
+    # grade no longer depends on gender and age.
+    dataset['grade'] = np.random.RandomState(1).permutation(dataset['grade'])
+    drifted_file = str(tmp_path / 'drifted.csv')
+    dataset.to_csv(drifted_file, index=False)
+
+    described = describe_correlated(drifted_file, bayesian_network=previous.bayesian_network,
+                                    edge_mutual_information=previous.edge_mutual_information, drift_threshold=0.5)
+    searched = describe_correlated(drifted_file)
+    assert described.bayesian_network != previous.bayesian_network
+    assert described.bayesian_network == searched.bayesian_network
+    assert described.edge_mutual_information == searched.edge_mutual_information
+
+
+def test_check_drift_on_sample_network_was_learned_on(dataset_file):
+    sampled = describe_correlated(dataset_file, sample_size=150)
+    assert sampled.edge_mutual_information_sampling == {'sample_size': 150, 'stratify_by': None}
+
+    # mutual information is lower on all rows than on the sample, which is not drift.
+    assert not describe_correlated(dataset_file).is_reusable(sampled.bayesian_network,
+                                                             sampled.edge_mutual_information, drift_threshold=0.1)
+    reused = describe_correlated(dataset_file, bayesian_network=sampled.bayesian_network,
+                                 edge_mutual_information=sampled.edge_mutual_information, drift_threshold=0,
+                                 edge_mutual_information_sampling=sampled.edge_mutual_information_sampling)
+    assert reused.bayesian_network == sampled.bayesian_network
+    assert reused.edge_mutual_information_sampling == sampled.edge_mutual_information_sampling
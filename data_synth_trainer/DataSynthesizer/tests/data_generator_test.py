@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from DataDescriber import DataDescriber
+from DataGenerator import DataGenerator
+from lib.utils import set_random_seed
+
+data_folder = Path(__file__).parent / 'data'
+legacy_description_file = str(data_folder / 'description_correlated_legacy.json')
+
+
+@pytest.fixture(params=['random', 'independent', 'correlated'])
+def description(request, tmp_path, dataset_file):
+    describer = DataDescriber()
+    attribute_to_is_candidate_key = {'id': True}
+    if request.param == 'random':
+        describer.describe_dataset_in_random_mode(dataset_file,
+                                                  attribute_to_is_candidate_key=attribute_to_is_candidate_key)
+    elif request.param == 'independent':
+        describer.describe_dataset_in_independent_attribute_mode(
+            dataset_file, attribute_to_is_candidate_key=attribute_to_is_candidate_key)
+    else:
+        describer.describe_dataset_in_correlated_attribute_mode(
+            dataset_file, k=2, attribute_to_is_candidate_key=attribute_to_is_candidate_key)
+    description_file = str(tmp_path / f'description_{request.param}.json')
+    describer.save_dataset_description_to_file(description_file)
+    return request.param, description_file
+
+
+def assert_frequencies(values, bins, distribution, atol=0.02):
+    frequencies = values.value_counts(normalize=True).reindex(bins, fill_value=0).to_numpy()
+    np.testing.assert_allclose(frequencies, distribution, atol=atol)
+
+
+def test_generate_from_legacy_conditional_distributions():
+    # conditional distributions saved as dicts keyed by str([parent bin indices]), before they were stored as arrays.
+    generator = DataGenerator()
+    generator.generate_dataset_in_correlated_attribute_mode(50000, legacy_description_file)
+    df = generator.synthetic_dataset
+    cpts = generator.description['conditional_probabilities']
+    z_distribution = generator.description['attribute_description']['z']['distribution_probabilities']
+
+    assert_frequencies(df['x'], ['a', 'b'], cpts['x'])
+    for x_idx, x in enumerate(['a', 'b']):
+        assert_frequencies(df.loc[df['x'] == x, 'y'], [1, 2, 3], cpts['y'][str([x_idx])])
+        for y_idx, y in enumerate([1, 2, 3]):
+            rows = (df['x'] == x) & (df['y'] == y)
+            # parent instances missing from the description are sampled from the distribution of the child.
+            distribution = cpts['z'].get(str([x_idx, y_idx]), z_distribution)
+            assert_frequencies(df.loc[rows, 'z'], ['p', 'q'], distribution, atol=0.04)
+
+
+@pytest.mark.parametrize('parents_instance', [[0, 2], [1, 1]])
+def test_legacy_conditional_distributions_as_array(parents_instance):
+    generator = DataGenerator()
+    generator.generate_dataset_in_correlated_attribute_mode(10, legacy_description_file)
+    bn = generator.description['bayesian_network']
+    cpts = generator.description['conditional_probabilities']
+    cardinalities = DataGenerator.get_attribute_cardinalities(bn, cpts)
+    assert cardinalities == {'x': 2, 'y': 3, 'z': 2}
+    table = DataGenerator.get_conditional_distributions('z', ['x', 'y'], cpts, cardinalities)
+    assert table.shape == (6, 2)
+    np.testing.assert_array_equal(table[np.ravel_multi_index(parents_instance, [2, 3])],
+                                  cpts['z'][str(parents_instance)])
+    assert np.isnan(table[np.ravel_multi_index([1, 2], [2, 3])]).all()
+
+
+def test_batches_in_parallel_equal_serial(tmp_path, description):
+    mode, description_file = description
+    contents = []
+    for processes in [1, 2]:
+        file_name = tmp_path / f'synthetic_{processes}.csv'
+        DataGenerator().save_synthetic_data_in_batches(str(file_name), mode, 1000, description_file, batch_size=300,
+                                                       seed=1, processes=processes)
+        contents.append(file_name.read_bytes())
+    assert contents[0] == contents[1]
+    assert contents[0].count(b'\n') == 1001
+
+
+@pytest.mark.parametrize('mode', ['random', 'independent'])
+def test_string_lengths_drawn_once_per_dataset(tmp_path, dataset_file, mode):
+    describer = DataDescriber()
+    attribute_to_is_candidate_key = {'notes': True}
+    if mode == 'random':
+        describer.describe_dataset_in_random_mode(dataset_file,
+                                                  attribute_to_is_candidate_key=attribute_to_is_candidate_key)
+    else:
+        describer.describe_dataset_in_independent_attribute_mode(
+            dataset_file, attribute_to_is_candidate_key=attribute_to_is_candidate_key)
+    description_file = str(tmp_path / 'description.json')
+    describer.save_dataset_description_to_file(description_file)
+
+    prefix_lengths = []
+    for batch_size in [100, 1000]:
+        batches = list(DataGenerator().iter_batches(mode, 1000, description_file, batch_size=batch_size))
+        assert len(batches) == 1000 // batch_size
+        keys = np.concatenate([batch['notes'].to_numpy() for batch in batches]).astype(str)
+        # keys are a random prefix followed by the row number.
+        lengths = np.char.str_len(keys) - np.char.str_len(np.arange(1000).astype(str))
+        assert (lengths == lengths[0]).all()
+        prefix_lengths.append(lengths[0])
+    assert prefix_lengths[0] == prefix_lengths[1]
+
+
+def test_random_strings_of_one_length_per_dataset(tmp_path, dataset_file):
+    describer = DataDescriber()
+    describer.describe_dataset_in_random_mode(dataset_file)
+    description_file = str(tmp_path / 'description.json')
+    describer.save_dataset_description_to_file(description_file)
+    notes = describer.data_description['attribute_description']['notes']
+    assert notes['min'] < notes['max']
+
+    # drawn from the seed of the dataset, before it is split into the seeds of the batches.
+    set_random_seed(3)
+    length = DataGenerator.draw_string_lengths(describer.data_description)['notes']
+    for batch_size in [100, 1000]:
+        batches = DataGenerator().iter_batches('random', 1000, description_file, batch_size=batch_size, seed=3)
+        lengths = np.concatenate([batch['notes'].str.len().to_numpy() for batch in batches])
+        assert (lengths == length).all()
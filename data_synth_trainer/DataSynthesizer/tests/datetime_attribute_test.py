@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from dateutil.parser import parse
+
+from datatypes.DateTimeAttribute import DATETIME_FORMATS, parse_timestamps
+
+epoch_datetime = parse('1970-01-01')
+# days after the 12th tell day-first formats from month-first ones, and dates before 1970 have negative timestamps.
+datetimes = [datetime(2020, 3, 15, 8, 30, 5), datetime(1969, 7, 20, 20, 17, 40), datetime(2021, 12, 31, 23, 59, 59),
+             datetime(2000, 2, 29), datetime(1999, 11, 13, 0, 0, 1), datetime(2020, 3, 15, 8, 30, 5)]
+
+
+def dateutil_timestamps(values, dayfirst=False):
+    """Seconds since epoch as parsed before formats were detected, one string at a time by dateutil."""
+    return [int((parse(x, dayfirst=dayfirst) - epoch_datetime).total_seconds()) for x in values]
+
+
+@pytest.mark.parametrize('datetime_format', DATETIME_FORMATS)
+def test_parse_timestamps_equals_dateutil(datetime_format):
+    values = pd.Series([value.strftime(datetime_format) for value in datetimes], index=range(10, 16))
+    timestamps = parse_timestamps(values)
+    assert timestamps.index.equals(values.index)
+    assert timestamps.tolist() == dateutil_timestamps(values, dayfirst=datetime_format.startswith('%d'))
+
+
+def test_parse_values_of_other_formats_by_dateutil():
+    dates = pd.date_range('2020-01-01', periods=50).strftime('%Y-%m-%d').tolist()
+    values = pd.Series(dates + ['16 March 2020 10:00', '2020-03-17 08:00:00.250'])
+    # the format is detected on a sample of the dates only, and the other values fall back to dateutil.
+    assert parse_timestamps(values, sample_size=10).tolist() == dateutil_timestamps(values)
+
+
+def test_parse_ambiguous_dates_day_first():
+    values = pd.Series(['03/04/2020', '25/04/2020'])
+    # the column is day-first as a whole, whereas dateutil alone reads the ambiguous date month-first.
+    assert parse_timestamps(values).tolist() == dateutil_timestamps(values, dayfirst=True)
+    assert parse_timestamps(values)[0] == int((datetime(2020, 4, 3) - epoch_datetime).total_seconds())
+    assert dateutil_timestamps(values)[0] == int((datetime(2020, 3, 4) - epoch_datetime).total_seconds())
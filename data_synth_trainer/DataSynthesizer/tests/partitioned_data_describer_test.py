@@ -0,0 +1,36 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataDescriber import DataDescriber
+from PartitionedDataDescriber import PartitionedDataDescriber
+from lib.utils import NumpyEncoder
+
+
+@pytest.fixture
+def partition_files(dataset_file, tmp_path):
+    df = pd.read_csv(dataset_file)
+    file_names = []
+    for idx, partition in enumerate(np.array_split(df, [150, 400])):
+        file_name = tmp_path / f'partition{idx}.csv'
+        partition.to_csv(file_name, index=False)
+        file_names.append(str(file_name))
+    return file_names
+
+
+@pytest.mark.parametrize('mode', ['independent', 'correlated'])
+@pytest.mark.parametrize('executor', [None, ThreadPoolExecutor(2)])
+def test_partitioned_description_equals_in_memory(dataset_file, partition_files, mode, executor):
+    descriptions = []
+    for describer, file_name in [(DataDescriber(), dataset_file),
+                                 (PartitionedDataDescriber(chunk_size=70, executor=executor, processes=2),
+                                  partition_files)]:
+        if mode == 'correlated':
+            describer.describe_dataset_in_correlated_attribute_mode(file_name, k=2, epsilon=0.1)
+        else:
+            describer.describe_dataset_in_independent_attribute_mode(file_name, epsilon=0.1)
+        descriptions.append(json.dumps(describer.data_description, cls=NumpyEncoder, sort_keys=True))
+    assert descriptions[0] == descriptions[1]
@@ -0,0 +1,75 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from DataDescriber import DataDescriber
+from lib.PrivBayes import MutualInformationCache, SearchBudget, attach_to_cached_parents, greedy_bayes
+
+
+def make_encoded_dataset(num_rows=2000, seed=0):
+    """Encoded dataset of chained and independent attributes, whose mutual information has no ties."""
+    random_state = np.random.RandomState(seed)
+    a = random_state.randint(4, size=num_rows)
+    b = (a + random_state.randint(2, size=num_rows)) % 4
+    c = (2 * b + random_state.randint(3, size=num_rows)) % 5
+    d = random_state.randint(3, size=num_rows)
+    e = (a + d + random_state.randint(4, size=num_rows)) % 6
+    f = (c + random_state.randint(5, size=num_rows)) % 3
+    return pd.DataFrame({'a': a, 'b': b, 'c': c, 'd': d, 'e': e, 'f': f})
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_maximum_spanning_tree_equals_greedy_search(seed):
+    dataset = make_encoded_dataset(seed=seed)
+    random.seed(seed)
+    tree = greedy_bayes(dataset, 1, 0)
+    # a budget without limits takes the greedy search instead of the tree.
+    random.seed(seed)
+    budget = SearchBudget()
+    searched = greedy_bayes(dataset, 1, 0, budget=budget)
+    assert budget.num_evaluations > 0
+    assert tree == searched
+
+
+def test_attach_to_cached_parents_of_highest_mutual_information():
+    mi_cache = MutualInformationCache()
+    mi_cache.update([('c', ['a']), ('c', ['b']), ('c', ['a', 'b']), ('c', ['x']), ('d', ['x'])],
+                    [0.1, 0.3, 0.2, 0.9, 0.9])
+    N = attach_to_cached_parents(['c', 'd'], ['a', 'b'], mi_cache, 0, {}, 100)
+    # candidates with parents outside of V are ignored, and an attribute without any is attached to the last of V.
+    assert N == [('c', ['b']), ('d', ['b'])]
+
+
+@pytest.mark.parametrize('budget', [SearchBudget(evaluations=0), SearchBudget(seconds=0)])
+def test_zero_budget_attaches_every_attribute_to_root(budget):
+    dataset = make_encoded_dataset()
+    random.seed(0)
+    N = greedy_bayes(dataset, 2, 0, budget=budget)
+    root = ({'a', 'b', 'c', 'd', 'e', 'f'} - {child for child, _ in N}).pop()
+    assert budget.num_evaluations == 0
+    assert budget.fallback_attributes == [attr for attr in dataset.columns if attr != root]
+    assert N == [(attr, [root]) for attr in budget.fallback_attributes]
+
+
+def test_budget_exhausted_after_first_iteration():
+    dataset = make_encoded_dataset()
+    random.seed(0)
+    budget = SearchBudget(evaluations=5)
+    N = greedy_bayes(dataset, 2, 0, budget=budget)
+    root = ({'a', 'b', 'c', 'd', 'e', 'f'} - {child for child, _ in N}).pop()
+    # the first iteration scores the 5 other attributes against the root, the second would score 4 more.
+    assert budget.num_evaluations == 5
+    assert N[0][1] == [root]
+    assert budget.fallback_attributes == [attr for attr in dataset.columns if attr not in {root, N[0][0]}]
+    assert N[1:] == [(attr, [root]) for attr in budget.fallback_attributes]
+
+
+def test_zero_evaluations_recorded_in_description(dataset_file):
+    describer = DataDescriber()
+    describer.describe_dataset_in_correlated_attribute_mode(dataset_file, k=2, epsilon=0, max_evaluations=0)
+    structure_learning = describer.data_description['structure_learning']
+    assert structure_learning['max_evaluations'] == 0
+    assert structure_learning['num_evaluations'] == 0
+    assert len(structure_learning['fallback_attributes']) == len(describer.bayesian_network)
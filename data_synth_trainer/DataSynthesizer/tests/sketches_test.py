@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+from lib.sketches import HyperLogLog, QuantileSketch
+
+
+def hashes(values):
+    return hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+def test_hyperloglog_estimate_within_error():
+    sketch = HyperLogLog()
+    sketch.update(hashes(np.arange(100000)))
+    assert abs(sketch.estimate() - 100000) <= 3 * sketch.relative_error * 100000
+
+
+def test_hyperloglog_small_cardinality():
+    sketch = HyperLogLog()
+    sketch.update(hashes(np.arange(50).repeat(3)))
+    assert round(sketch.estimate()) == 50
+
+
+def test_hyperloglog_merge_equals_sketch_of_whole_stream():
+    values = np.arange(60000)
+    whole, first, second = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    whole.update(hashes(values))
+    first.update(hashes(values[:40000]))
+    # the parts overlap, as distinct values are counted once.
+    second.update(hashes(values[20000:]))
+    first.merge(second)
+    np.testing.assert_array_equal(first.registers, whole.registers)
+    assert first.estimate() == whole.estimate()
+
+
+def test_quantile_sketch_rank_error():
+    values = np.random.RandomState(0).standard_normal(100000)
+    sketch = QuantileSketch()
+    sketch.update(values)
+    qs = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / values.size
+    assert np.max(np.abs(ranks - qs)) <= sketch.rank_error
+
+
+def test_quantile_sketch_merge():
+    values = np.random.RandomState(1).exponential(size=100000)
+    sketch = QuantileSketch()
+    for part in np.array_split(values, 7):
+        part_sketch = QuantileSketch(seed=len(part))
+        part_sketch.update(part)
+        sketch.merge(part_sketch)
+    assert sketch.num_values == values.size
+    qs = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / values.size
+    assert np.max(np.abs(ranks - qs)) <= sketch.rank_error
+
+
+def test_quantile_sketch_exact_below_capacity():
+    sketch = QuantileSketch()
+    sketch.update(np.arange(1, 101))
+    assert sketch.quantiles([0.5])[0] == 50
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+from sklearn.metrics import mutual_info_score
+
+from lib.utils import joint_codes, mutual_information, sample_from_distribution_rows, sample_row_indices
+
+
+@pytest.fixture
+def random_state():
+    return np.random.RandomState(0)
+
+
+def test_joint_codes_mixed_radix(random_state):
+    columns = np.column_stack([random_state.randint(3, size=1000), random_state.randint(4, size=1000)])
+    codes, size = joint_codes(columns, [3, 4])
+    assert size == 12
+    np.testing.assert_array_equal(codes, columns[:, 0] * 4 + columns[:, 1])
+
+
+def test_joint_codes_compacted_beyond_number_of_rows(random_state):
+    columns = random_state.randint(1000, size=(50, 3))
+    codes, size = joint_codes(columns, [1000, 1000, 1000])
+    # codes are compacted to the observed combinations, distinct rows keeping distinct codes.
+    assert size <= 50
+    assert codes.max() < size
+    assert np.unique(codes).size == np.unique(columns, axis=0).shape[0]
+
+
+@pytest.mark.parametrize('num_parents', [1, 2, 3])
+def test_mutual_information_equals_sklearn(random_state, num_parents):
+    cardinalities = [5, 3, 7, 2][:num_parents + 1]
+    columns = np.column_stack([random_state.randint(cardinality, size=2000) for cardinality in cardinalities])
+    # correlate the child with its first parent.
+    columns[:1000, 0] = columns[:1000, 1] % cardinalities[0]
+    child, parents = columns[:, 0], columns[:, 1:]
+    # as PrivBayes scored candidates before, with the values of the parents joined into one string label per row.
+    parent_labels = ['-'.join(map(str, row)) for row in parents]
+    expected = mutual_info_score(child.astype(str), parent_labels)
+    assert mutual_information(child, parents, cardinalities[0], cardinalities[1:]) == pytest.approx(expected)
+
+
+def test_mutual_information_of_sparse_contingency_table(random_state):
+    # more joint codes than rows, so the contingency table is counted by np.unique instead of np.bincount.
+    child = random_state.randint(50, size=300)
+    parents = random_state.randint(40, size=(300, 2))
+    expected = mutual_info_score(child.astype(str), ['-'.join(map(str, row)) for row in parents])
+    assert mutual_information(child, parents, 50, [40, 40]) == pytest.approx(expected)
+
+
+def test_mutual_information_of_empty_dataset():
+    assert mutual_information(np.empty(0, dtype=int), np.empty((0, 1), dtype=int), 1, [1]) == 0
+
+
+def test_sample_from_distribution_rows():
+    distributions = np.array([[0.5, 0.5, 0.0], [0.0, 0.0, 1.0], [0.1, 0.6, 0.3]])
+    rows = np.repeat([0, 1, 2], 100000)
+    np.random.seed(0)
+    draws = sample_from_distribution_rows(distributions, rows)
+    for row, distribution in enumerate(distributions):
+        frequencies = np.bincount(draws[rows == row], minlength=3) / 100000
+        np.testing.assert_allclose(frequencies, distribution, atol=0.01)
+        # bins of probability 0 are never drawn.
+        assert np.all(frequencies[distribution == 0] == 0)
+
+
+def test_sample_from_distribution_rows_with_rounding_errors():
+    # a row summing to slightly less than 1 draws its last bin for uniforms beyond its sum, not a bin of the next row.
+    distributions = np.array([[0.3, 0.3, 0.3999], [1.0, 0.0, 0.0]])
+    np.random.seed(0)
+    draws = sample_from_distribution_rows(distributions, np.zeros(100000, dtype=np.int64))
+    assert draws.max() == 2
+    np.testing.assert_allclose(np.bincount(draws) / 100000, [0.3, 0.3, 0.4], atol=0.01)
+
+
+def test_uniform_sample_row_indices():
+    np.random.seed(0)
+    indices = sample_row_indices(1000, 100)
+    assert indices.size == 100
+    assert np.all(np.diff(indices) > 0)
+    assert indices.min() >= 0 and indices.max() < 1000
+
+
+def test_sample_row_indices_all_rows():
+    np.testing.assert_array_equal(sample_row_indices(10, 20), np.arange(10))
+
+
+def test_stratified_sample_row_indices_proportions(random_state):
+    strata = np.repeat([0, 1, 2, 3], [6000, 3000, 990, 10])
+    random_state.shuffle(strata)
+    np.random.seed(0)
+    indices = sample_row_indices(strata.size, 1000, strata)
+    assert indices.size == 1000
+    assert np.all(np.diff(indices) > 0)
+    # every stratum gets one row first, and the rest in proportion to its size, so within one row of it.
+    np.testing.assert_allclose(np.bincount(strata[indices]), [600, 300, 99, 1], atol=1)
+
+
+def test_stratified_sample_row_indices_keeps_rare_strata():
+    strata = np.repeat([0, 1, 2], [9990, 5, 5])
+    np.random.seed(0)
+    counts = np.bincount(strata[sample_row_indices(strata.size, 100, strata)])
+    assert counts.sum() == 100
+    assert counts[1] >= 1 and counts[2] >= 1
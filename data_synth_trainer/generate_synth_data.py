@@ -12,6 +12,7 @@ from pick import pick
 from utils import *
 import threading
 from functools import partial
+from itertools import islice
 from db import *
 import json
 
@@ -67,6 +68,9 @@ for index, table in enumerate(config_tables):
 data_config = model_config.MODELS[attr_choice]['fields']
 attribute_to_datatype = extract_props(data_config, 'type', SYNTH_TOOL)
 
+# categorical strings are read as pandas categoricals and integers in their narrowest width to save memory
+attribute_to_dtype = extract_dtypes(data_config, SYNTH_TOOL)
+
 # ****************
 
 # you do not have to specify these here but it gives clarity to DS to do so
@@ -115,7 +119,7 @@ def describe_synthetic_data(mode: str, description_filepath: str, data_filepath:
     category_threshold -- limit at which categories are considered blah
     description_filepath -- filepath to the data description
     '''
-    describer = DataDescriber()
+    describer = DataDescriber(processes=model_config.DESCRIBE_PROCESSES, attribute_to_dtype=attribute_to_dtype)
 
     if mode == 'random':
         describer.describe_dataset_in_random_mode(
@@ -136,16 +140,85 @@ def describe_synthetic_data(mode: str, description_filepath: str, data_filepath:
 
         degree_of_bayesian_network = model_config.CORRELATED_DEGREE_OF_BAYESIAN_NETWORK
 
+        # the network of the previous description is reused, and searched again if the data drifted from the
+        # mutual information saved with its counts, when they were saved
+        bayesian_network = None
+        edge_mutual_information = None
+        edge_mutual_information_sampling = None
+        if model_config.CORRELATED_REUSE_BAYESIAN_NETWORK and os.path.exists(description_filepath):
+            bayesian_network = read_json_file(description_filepath)['bayesian_network']
+            if os.path.exists(counts_filepath(description_filepath)):
+                edge_mutual_information, edge_mutual_information_sampling = \
+                    DataDescriber.read_edge_mutual_information(counts_filepath(description_filepath))
+
         describer.describe_dataset_in_correlated_attribute_mode(
             dataset_file=data_filepath, 
             epsilon=epsilon, 
             k=degree_of_bayesian_network,
             attribute_to_datatype=attribute_to_datatype,
             attribute_to_is_categorical=attribute_is_categorical,
-            attribute_to_is_candidate_key=candidate_keys)
-
+            attribute_to_is_candidate_key=candidate_keys,
+            bayesian_network=bayesian_network,
+            edge_mutual_information=edge_mutual_information,
+            edge_mutual_information_sampling=edge_mutual_information_sampling,
+            drift_threshold=model_config.CORRELATED_DRIFT_THRESHOLD if edge_mutual_information else None,
+            sample_size=model_config.CORRELATED_STRUCTURE_SAMPLE_SIZE,
+            stratify_by=model_config.CORRELATED_STRUCTURE_STRATIFY_BY,
+            time_budget=model_config.CORRELATED_TIME_BUDGET)
+
+    # release the copies of the input dataset held by the describer once it is described
+    describer.finalize()
     describer.save_dataset_description_to_file(description_filepath)
 
+    # noise-free counts are kept next to the description only on request, as they are not differentially private
+    if mode != 'random' and model_config.SAVE_DISTRIBUTION_COUNTS:
+        describer.save_distribution_counts(counts_filepath(description_filepath))
+
+
+def counts_filepath(description_filepath: str):
+    return os.path.splitext(description_filepath)[0] + '_counts.npz'
+
+
+def refresh_synthetic_data_description(mode: str, description_filepath: str, data_filepath: str):
+    '''
+    Folds the rows appended to the table since it was described into the
+    description, instead of describing the whole table again. The domains and
+    Bayesian network of the description are kept.
+
+    Keyword arguments:
+    mode -- what type of synthetic data, independent or correlated
+    description_filepath -- filepath to the data description, refreshed in place
+    data_filepath -- filepath to the whole table, in insertion order
+    '''
+    num_described = read_json_file(description_filepath)['meta']['num_tuples']
+    new_rows_filepath = os.path.splitext(data_filepath)[0] + '_new_rows.csv'
+
+    # rows are copied as they are, so that they are parsed like the rows described
+    with open(data_filepath, newline='') as data_file, open(new_rows_filepath, 'w', newline='') as new_rows_file:
+        reader = csv.reader(data_file)
+        writer = csv.writer(new_rows_file)
+        writer.writerow(next(reader))
+        num_new = 0
+        for row in islice(reader, num_described, None):
+            writer.writerow(row)
+            num_new += 1
+
+    if num_new:
+        describer = DataDescriber(processes=model_config.DESCRIBE_PROCESSES, attribute_to_dtype=attribute_to_dtype)
+        epsilon = model_config.CORRELATED_EPSILON_VALUE if mode == 'correlated' else 0.1
+
+        describer.refresh_dataset_description(
+            description_filepath,
+            counts_filepath(description_filepath),
+            new_rows_filepath,
+            epsilon=epsilon)
+
+        describer.finalize()
+        describer.save_dataset_description_to_file(description_filepath)
+        describer.save_distribution_counts(counts_filepath(description_filepath))
+
+    os.remove(new_rows_filepath)
+
 
 def generate_synthetic_data(
         mode: str, 
@@ -164,16 +237,14 @@ def generate_synthetic_data(
     '''
     generator = DataGenerator()
 
-    if mode == 'random':
-        generator.generate_dataset_in_random_mode(num_rows, description_filepath)
-            
-    elif mode == 'independent':
-        generator.generate_dataset_in_independent_mode(num_rows, description_filepath)
-    
-    elif mode == 'correlated':
-        generator.generate_dataset_in_correlated_attribute_mode(num_rows, description_filepath)
-
-    generator.save_synthetic_data(synthetic_data_filepath)
+    # written batch by batch so memory does not grow with num_rows, batches are generated on all cores
+    generator.save_synthetic_data_in_batches(
+        synthetic_data_filepath,
+        mode,
+        num_rows,
+        description_filepath,
+        batch_size=model_config.GENERATION_BATCH_SIZE,
+        processes=os.cpu_count())
 
 
 def compare_histograms(
@@ -277,13 +348,19 @@ def run_trainer(mode_choice):
     num_rows = len(data_df)
     save_file_name = table_choice + '_' + name_choice
     
-    print('describing synthetic data for', mode_choice, 'mode...')
-    describe_synthetic_data(
-        mode_choice, 
-        mode_filepaths(mode_choice, 'description', save_file_name), 
-        temp_file_path, 
-        candidate_keys
-    )
+    description_filepath = mode_filepaths(mode_choice, 'description', save_file_name)
+    if mode_choice != 'random' and model_config.REFRESH_DESCRIPTION_WITH_NEW_ROWS \
+            and os.path.exists(counts_filepath(description_filepath)):
+        print('refreshing synthetic data description for', mode_choice, 'mode...')
+        refresh_synthetic_data_description(mode_choice, description_filepath, temp_file_path)
+    else:
+        print('describing synthetic data for', mode_choice, 'mode...')
+        describe_synthetic_data(
+            mode_choice, 
+            description_filepath, 
+            temp_file_path, 
+            candidate_keys
+        )
     
     print('generating synthetic data for', mode_choice, 'mode...')
     generate_synthetic_data(
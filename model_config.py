@@ -20,6 +20,38 @@ CORRELATED_EPSILON_VALUE = 0
 # The maximum number of parents in Bayesian network
 # i.e., the maximum number of incoming edges.
 CORRELATED_DEGREE_OF_BAYESIAN_NETWORK = 1
+# Reuse the Bayesian network of the previous description of a table
+# instead of searching a new one. If its counts were saved (see
+# SAVE_DISTRIBUTION_COUNTS), a new one is searched when the mutual
+# information of one of its edges decreased by more than the drift
+# threshold (a fraction).
+CORRELATED_REUSE_BAYESIAN_NETWORK = False
+CORRELATED_DRIFT_THRESHOLD = 0.1
+# Learn the Bayesian network on a sample of this many rows (None for all
+# rows), optionally stratified by an attribute. Conditional distributions
+# are always computed over all rows.
+CORRELATED_STRUCTURE_SAMPLE_SIZE = None
+CORRELATED_STRUCTURE_STRATIFY_BY = None
+# Seconds the search of the Bayesian network may spend (None for no limit).
+# Attributes left once it is spent are attached to the best parents scored
+# so far, and listed in the description.
+CORRELATED_TIME_BUDGET = None
+# Save the noise-free counts behind a description next to it, e.g., to
+# refresh the description with rows appended to its table later. They are
+# not differentially private, so they are not saved by default.
+SAVE_DISTRIBUTION_COUNTS = False
+# Refresh the previous description of a table with the rows appended to it
+# since, instead of describing the whole table again, when its counts were
+# saved. Rows are taken as appended after the number of rows described, so
+# the table must be exported in insertion order. Domains and the Bayesian
+# network of the description are kept.
+REFRESH_DESCRIPTION_WITH_NEW_ROWS = False
+# Number of worker processes parsing datetime and string columns when
+# describing a table. Values are sent to the workers and back, which can
+# cost more than the parsing itself, so the default is to parse in process.
+DESCRIBE_PROCESSES = 1
+# Number of synthetic rows generated and written to file at a time.
+GENERATION_BATCH_SIZE = 100000
 
 # ------------------------------------------------------------------
 # GPT2 CONFIG